@@ -1,69 +1,63 @@
 import os
+import sys
 import streamlit as st
-from google import genai
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from utils import api_request
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+import embeddings
+import lexical_index
+import rag_engine
+import vector_index
 
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 CHROMA_DB_PATH = "../data/bus_db"
-COLLECTION_NAME ="bus_infomation"
-
-if GEMINI_API_KEY:
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    LLM_MODEL = 'gemini-2.5-flash-lite'
-else:
-    st.error("GEMINI_API_KEY not found. Please set the environment variable.")
-    st.stop()
+COLLECTION_NAME = embeddings.collection_name("bus_infomation")
+LLM_MODEL = 'gemini-2.5-flash-lite'
 
 @st.cache_resource
 def get_chroma_client_and_collection(path: str, collection_name: str):
     try:
-        embedding_function = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
-        
-        collection = Chroma(
-            collection_name,
-            embedding_function=embedding_function,
-            persist_directory=path
-        )
-        return collection
+        embedding_function = embeddings.get_embedding_function()
+        if vector_index.VECTOR_STORE == "numpy":
+            path = os.path.join(vector_index.INDEX_PATH, collection_name)
+            collection = vector_index.NumpyVectorIndex(path, embedding_function)
+        else:
+            from langchain_chroma import Chroma
+
+            collection = Chroma(
+                collection_name,
+                embedding_function=embedding_function,
+                persist_directory=path
+            )
+        return lexical_index.make_retriever(collection, path, collection_name)
         
     except Exception as e:
         st.error(f"Error loading ChromaDB collection: {e}")
         st.info(f"Make sure the directory '{path}' and collection '{collection_name}' exist.")
         return None
 
-def get_rag_answer(user_query: str, collection) -> str:
-    
-    results = collection.similarity_search(user_query)
-    
-    results = [doc.page_content for doc in results]
-    retrieved_context = " ".join(results)
-    
-    prompt = f"""
-    You are an expert bus ticket service assistant. Use ONLY the following retrieved context
-    to answer the user's question about bus provider policies, contact details, or specific
-    rules. If the information is not found in the context, politely state that you cannot
-    answer based on the available provider data.
-    
-    CONTEXT: {retrieved_context}
-    
-    QUESTION: {user_query}
-    
-    ANSWER:
-    """
+@st.cache_resource
+def get_engine(_collection):
+    # One engine per Streamlit server: Gemini client, prompt and answer cache (shared with the API) are reused across reruns.
+    engine = rag_engine.RagEngine(COLLECTION_NAME, model=LLM_MODEL, retriever=_collection)
+    engine.warm_up()
+    return engine
 
+def get_rag_answer(user_query: str, engine) -> str:
     try:
-        response = client.models.generate_content(
-            model=LLM_MODEL,
-            contents=prompt
-        )
-        return response.text
+        return engine.answer(user_query)
     except Exception as e:
         return f"An error occurred during generation: {e}"
-    
+
+
+def route_query(user_query: str):
+    """Route/fare/coverage answer from the API's SQL router, or None to use RAG."""
+    try:
+        return api_request('POST', 'route_query', data={"query": user_query}).get("answer")
+    except Exception:
+        return None
 
 
 st.title("Ask Questions about ticket")
@@ -72,7 +66,18 @@ collection = get_chroma_client_and_collection(CHROMA_DB_PATH, COLLECTION_NAME)
 
 if collection is None:
     st.stop()
+
+engine = get_engine(collection)
+if engine.client is None:
+    st.error("GEMINI_API_KEY not found. Please set the environment variable.")
+    st.stop()
     
+with st.sidebar.expander("Answer cache"):
+    stats = engine.answer_cache.stats()
+    st.metric("Hit rate", f"{stats['hit_rate']:.0%}" if stats["hit_rate"] is not None else "n/a")
+    st.caption(f"{stats['exact_hits']} exact, {stats['semantic_hits']} similar, {stats['misses']} misses; "
+               f"{stats['seconds_saved']:.1f} s of generation saved")
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
     
@@ -86,7 +91,7 @@ if prompt := st.chat_input("Ask a question about ticket / bus information"):
         st.markdown(prompt)
 
     with st.spinner("Searching and generating response..."):
-        answer = get_rag_answer(prompt, collection)
+        answer = route_query(prompt) or get_rag_answer(prompt, engine)
 
     with st.chat_message("assistant"):
         st.markdown(answer)
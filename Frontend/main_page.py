@@ -1,9 +1,12 @@
 import streamlit as st
 import pandas as pd
+import requests
 from datetime import datetime
-from utils import api_request
+from utils import api_request, api_requests
 
 DISTRICTS = ["Dhaka", "Chattogram", "Rajshahi", "Sylhet", "Barishal", "Khulna"]
+# Seat counts are fetched per route, in parallel; larger result lists skip the column.
+SEAT_LOOKUP_LIMIT = 50
 st.set_page_config(layout="wide", page_title="Bus Booking System")
 
 st.header("🚌 Search & Book Tickets")
@@ -54,6 +57,13 @@ if st.session_state['search_performed']:
         df = df[['id', 'provider_name', 'departure_time', 'dropping_point', 'fare']]
         df.columns = ['Route ID', 'Provider', 'Time', 'Dropping Point', 'Fare (Taka)']
         df['Time'] = df['Time'].fillna('N/A (Schedule not set)') 
+        if len(results) <= SEAT_LOOKUP_LIMIT:
+            availability = api_requests(
+                [{"method": "GET", "endpoint": f"routes/{r['id']}/seats"} for r in results], return_exceptions=True
+            )
+            df['Seats Left'] = [
+                len(a['available_seats']) if isinstance(a, dict) else 'N/A' for a in availability
+            ]
 
         st.dataframe(df, width='stretch', hide_index=True)
 
@@ -62,7 +72,7 @@ if st.session_state['search_performed']:
         with st.form("booking_form"):
             col_id, col_seat = st.columns(2)
             route_id = col_id.number_input("Enter Route ID to Book", min_value=1, step=1, format="%d", key="book_route_id")
-            seat_number = col_seat.text_input("Seat Number (e.g., A1, B3)", value="A1", key="book_seat_num")
+            seat_number = col_seat.text_input("Seat Number (e.g., 1A, 3B; rows 1-10, letters A-D)", value="1A", key="book_seat_num")
             
             name = st.text_input("Your Full Name", max_chars=100, key="book_name")
             phone = st.text_input("Your Phone Number", max_chars=20, key="book_phone")
@@ -79,13 +89,22 @@ if st.session_state['search_performed']:
                         "user_phone": phone,
                         "seat_number": seat_number,
                     }
-                    booking_result = api_request('POST', 'book_ticket', data=booking_data)
+                    try:
+                        booking_result = api_request('POST', 'book_ticket', data=booking_data)
+                    except requests.HTTPError as e:
+                        # 409: seat already taken, 400: seat label not on this bus, 404: unknown route.
+                        try:
+                            detail = e.response.json()["detail"]
+                        except (ValueError, KeyError, TypeError):
+                            detail = e.response.text
+                        booking_result = None
+                        st.error(f"Booking failed: {detail}")
                     
                     if booking_result:
                         st.success(f"Booking Successful! Your Booking ID is **{booking_result['id']}**. Please check the 'My Bookings' tab.")
                         st.session_state.current_phone = phone
                         st.balloons()
-                    else:
+                    elif booking_result is not None:
                         st.error("Booking failed. Please try again.")
     else:
         st.error("No buses found for this route on this date.")
\ No newline at end of file
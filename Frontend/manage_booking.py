@@ -4,32 +4,58 @@ import pandas as pd
 from utils import api_request
 
 DISTRICTS = ["Dhaka", "Chattogram", "Rajshahi", "Sylhet", "Barishal", "Khulna"]
+PAGE_SIZE = 20
+STATUS_FILTERS = {"All": None, "Booked": "Booked", "Canceled": "Canceled"}
 
 if 'current_bookings' not in st.session_state:
     st.session_state['current_bookings'] = None
 if 'searched_phone' not in st.session_state:
     st.session_state['searched_phone'] = ""
+if 'next_before_id' not in st.session_state:
+    st.session_state['next_before_id'] = None
+if 'status_filter' not in st.session_state:
+    st.session_state['status_filter'] = "All"
 
 st.header("🎫 My Bookings")
 
-def load_bookings(phone_number):
+def fetch_page(phone_number, status_filter, before_id=None):
+    # Compact pages: this view only needs the route id, not the embedded route.
+    params = {"limit": PAGE_SIZE, "compact": "true"}
+    if STATUS_FILTERS[status_filter]:
+        params["status"] = STATUS_FILTERS[status_filter]
+    if before_id:
+        params["before_id"] = before_id
+    return api_request('GET', f'bookings/{phone_number}', params=params)
+
+def load_bookings(phone_number, status_filter="All"):
+    """Show the newest page of bookings for the phone number."""
     if phone_number:
-        bookings = api_request('GET', f'bookings/{phone_number}')
-        st.session_state['current_bookings'] = bookings
+        page = fetch_page(phone_number, status_filter)
+        st.session_state['current_bookings'] = page['bookings']
+        st.session_state['next_before_id'] = page['next_before_id']
         st.session_state['searched_phone'] = phone_number
+        st.session_state['status_filter'] = status_filter
     else:
         st.session_state['current_bookings'] = None
+        st.session_state['next_before_id'] = None
         st.session_state['searched_phone'] = ""
 
+def load_more_bookings():
+    page = fetch_page(st.session_state['searched_phone'], st.session_state['status_filter'], st.session_state['next_before_id'])
+    st.session_state['current_bookings'] = st.session_state['current_bookings'] + page['bookings']
+    st.session_state['next_before_id'] = page['next_before_id']
+
 initial_phone = st.session_state.get('current_phone', '')
 phone_to_search = st.text_input("Enter your Phone Number to view bookings:", 
                                 value=st.session_state.get('searched_phone', initial_phone),
                                 key="manage_phone_input")
+status_to_show = st.radio("Show", options=list(STATUS_FILTERS), horizontal=True, key="manage_status_input",
+                          index=list(STATUS_FILTERS).index(st.session_state['status_filter']))
 
 st.button(
     "Load Bookings",
     on_click=load_bookings,
-    args=(phone_to_search,)
+    args=(phone_to_search, status_to_show)
 )
 
 bookings = st.session_state['current_bookings']
@@ -51,6 +77,8 @@ if bookings is not None and phone_number:
         
         df_bookings = pd.DataFrame(booking_list)
         st.dataframe(df_bookings, width='stretch', hide_index=True)
+        if st.session_state['next_before_id']:
+            st.button(f"Load {PAGE_SIZE} more", on_click=load_more_bookings)
 
         st.markdown("---")
         st.subheader("Cancel a Booking")
@@ -63,7 +91,7 @@ if bookings is not None and phone_number:
                 
                 if cancel_result and cancel_result.get('status') == 'Canceled':
                     st.success(f"Booking ID **{cancel_id}** has been successfully Canceled. Refreshing list...")
-                    load_bookings(phone_number) 
+                    load_bookings(phone_number, st.session_state['status_filter'])
                     st.rerun()
                 elif cancel_result:
                     st.warning(f"Cancellation failed or status was not updated for ID {cancel_id}.")
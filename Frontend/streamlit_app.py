@@ -1,10 +1,5 @@
-import os
-# import chromadb
+# Navigation only: genai, Chroma and the embeddings are imported by the pages that use them.
 import streamlit as st
-from google import genai
-from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 st.set_page_config(layout="wide", page_title="Ticket Booking System")
 
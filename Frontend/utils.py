@@ -4,32 +4,151 @@ import pandas as pd
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_URL = "http://127.0.0.1:8000/api/"
 DISTRICTS = ["Dhaka", "Chattogram", "Rajshahi", "Sylhet", "Barishal", "Khulna"]
 
 
-def api_request(method: str, endpoint: str, data: Optional[Dict[str, Any]] = None, params: Optional[Dict[str, Any]] = None, timeout: int = 7):
+# One ApiClient per Streamlit server (st.cache_resource), shared by every page,
+# session and rerun:
+# - requests go through one keep-alive connection pool;
+# - idempotent calls are retried with exponential backoff on connection errors and 502/503/504
+#   (urllib3's default allowed methods; POSTs such as bookings are never repeated);
+# - GET responses with an ETag are cached by URL and params. Catalog reads (the
+#   responses carrying X-Catalog-Version) are served without a request for
+#   CATALOG_CACHE_TTL seconds and then revalidated with If-None-Match, which
+#   returns the cached body on 304. When a response reports a new catalog
+#   version, entries cached under the old version are dropped.
+CACHE_SIZE = 256
+CATALOG_CACHE_TTL = 60  # the API's CATALOG_MAX_AGE
+POOL_SIZE = 16
+RETRIES = 3
+RETRY_BACKOFF = 0.3
+PARALLEL_REQUESTS = 8
+
+
+class CacheEntry:
+    __slots__ = ("etag", "body", "version", "expires")
 
-    ALL_ROUTES_ENDPOINT = f"{API_URL}{endpoint}"
+    def __init__(self, etag: str, body, version: Optional[str], expires: float):
+        self.etag = etag
+        self.body = body
+        self.version = version
+        self.expires = expires
 
-    if method not in ('GET', 'POST', 'DELETE'):
-        raise ValueError("Unsupported HTTP method")
 
+def _cache_key(url: str, params: Optional[Dict[str, Any]]) -> tuple:
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _parse_body(response: requests.Response):
     try:
-        if method == 'GET':
-            response = requests.get(ALL_ROUTES_ENDPOINT, params=params, timeout=timeout)
-        elif method == 'POST':
-            response = requests.post(ALL_ROUTES_ENDPOINT, json=data, timeout=timeout)
-        else:
-            response = requests.delete(ALL_ROUTES_ENDPOINT, timeout=timeout)
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+class ApiClient:
+    def __init__(self, base_url: str = API_URL, ttl: float = CATALOG_CACHE_TTL, cache_size: int = CACHE_SIZE):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.catalog_version: Optional[str] = None
+        self._cache: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(PARALLEL_REQUESTS, thread_name_prefix="api")
+
+        retry = Retry(total=RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None, params: Optional[Dict[str, Any]] = None, timeout: int = 7):
+        if method not in ('GET', 'POST', 'DELETE'):
+            raise ValueError("Unsupported HTTP method")
+
+        url = f"{self.base_url}{endpoint}"
+        if method != 'GET':
+            response = self.session.request(method, url, json=data, timeout=timeout)
+            response.raise_for_status()
+            return _parse_body(response)
+
+        key = _cache_key(url, params)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                if cached.expires > time.monotonic():
+                    return cached.body
+
+        headers = {"If-None-Match": cached.etag} if cached is not None else None
+        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        version = response.headers.get("X-Catalog-Version")
+        if version:
+            self.set_catalog_version(version)
+        if response.status_code == 304 and cached is not None:
+            self._store(key, cached.etag, cached.body, version)
+            return cached.body
 
         response.raise_for_status()
+        body = _parse_body(response)
+        etag = response.headers.get("ETag")
+        if etag:
+            self._store(key, etag, body, version)
+        return body
+
+    def _store(self, key: tuple, etag: str, body, version: Optional[str]):
+        # Only catalog reads may skip revalidation; anything else is checked on every use.
+        expires = time.monotonic() + self.ttl if version else 0.0
+        with self._lock:
+            self._cache[key] = CacheEntry(etag, body, version, expires)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def set_catalog_version(self, version: str):
+        """Drop catalog entries cached under any other version; called for every X-Catalog-Version seen."""
+        with self._lock:
+            if version == self.catalog_version:
+                return
+            self.catalog_version = version
+            for key in [k for k, entry in self._cache.items() if entry.version and entry.version != version]:
+                del self._cache[key]
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def request_many(self, calls: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+        """Run several `request` calls (each a dict of its arguments) concurrently; results keep the order of `calls`."""
+        futures = [self._pool.submit(self.request, **call) for call in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+@st.cache_resource
+def get_client() -> ApiClient:
+    return ApiClient()
+
+
+def api_request(method: str, endpoint: str, data: Optional[Dict[str, Any]] = None, params: Optional[Dict[str, Any]] = None, timeout: int = 7):
+    return get_client().request(method, endpoint, data=data, params=params, timeout=timeout)
 
-        try:
-            return response.json()
-        except ValueError:
-            return response.text
 
-    except requests.exceptions.RequestException:
-        raise
\ No newline at end of file
+def api_requests(calls: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+    """Fetch several resources in parallel over the shared pool, e.g. ``[{"method": "GET", "endpoint": "routes/1/seats"}, ...]``."""
+    return get_client().request_many(calls, return_exceptions=return_exceptions)
@@ -0,0 +1,218 @@
+"""Two-level cache of generated RAG answers, shared by the API and the Streamlit chatbot.
+
+Level one is an exact match on the normalized question. Level two compares the
+question's embedding with cached questions and reuses an answer when the cosine
+similarity clears ANSWER_CACHE_THRESHOLD. Entries belong to a corpus version
+(a hash of the vector store's chunk ids), so re-ingesting different content
+stops old answers from being served. Entries expire after ANSWER_CACHE_TTL
+seconds and the least recently used are evicted beyond ANSWER_CACHE_SIZE.
+
+Everything lives in one SQLite file (WAL mode), so every process that points at
+the same path shares entries and counters.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "../data/answer_cache.db")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+
+STAT_NAMES = ("exact_hits", "semantic_hits", "misses", "seconds_saved")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    corpus_version TEXT NOT NULL,
+    query TEXT NOT NULL,
+    embedding BLOB,
+    answer TEXT NOT NULL,
+    model TEXT,
+    generation_seconds REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_answers_version ON answers (corpus_version, created_at);
+CREATE INDEX IF NOT EXISTS ix_answers_last_used ON answers (last_used_at);
+CREATE TABLE IF NOT EXISTS answer_stats (name TEXT PRIMARY KEY, value REAL NOT NULL DEFAULT 0);
+"""
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split()).rstrip("?.! ")
+
+
+def corpus_version(vector_store) -> str:
+    """Hash of the chunk ids in a vector store, a retriever wrapping one, or a bare BM25 index (RETRIEVAL_MODE=lexical)."""
+    store = getattr(vector_store, "vector_store", vector_store)
+    # BM25Index is built from the vector store's chunks, so its ids give the same version.
+    ids = sorted(store.ids if hasattr(store, "ids") and not hasattr(store, "get") else store.get(include=[])["ids"])
+    return hashlib.blake2b("\n".join(ids).encode(), digest_size=8).hexdigest()
+
+
+class AnswerCache:
+    def __init__(self, path: str = ANSWER_CACHE_PATH, corpus_version: str = "", ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_SIZE, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.path = path
+        self.corpus_version = corpus_version
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.executemany("INSERT OR IGNORE INTO answer_stats (name, value) VALUES (?, 0)", [(n,) for n in STAT_NAMES])
+        # Embedding matrix of live entries for the semantic lookup; reloaded when any process writes.
+        self._matrix_keys: list = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._matrix_data_version = None
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _key(self, normalized: str) -> str:
+        return hashlib.blake2b(f"{self.corpus_version}\0{normalized}".encode(), digest_size=16).hexdigest()
+
+    def _bump(self, name: str, amount: float = 1.0):
+        self._conn.execute("UPDATE answer_stats SET value = value + ? WHERE name = ?", (amount, name))
+
+    def _semantic_matrix(self, cutoff: float):
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._matrix_data_version:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM answers WHERE corpus_version = ? AND created_at >= ? AND embedding IS NOT NULL",
+                (self.corpus_version, cutoff),
+            ).fetchall()
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in rows]
+            dims = {v.shape[0] for v in vectors}
+            if len(dims) == 1:
+                self._matrix_keys = [key for key, _ in rows]
+                self._matrix = np.vstack(vectors)
+            else:
+                self._matrix_keys, self._matrix = [], np.zeros((0, 0), dtype=np.float32)
+            self._matrix_data_version = data_version
+        return self._matrix_keys, self._matrix
+
+    def _hit(self, key: str, kind: str, cutoff: float) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT answer, generation_seconds FROM answers WHERE key = ? AND created_at >= ?", (key, cutoff)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._transaction():
+            self._conn.execute("UPDATE answers SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            self._bump(kind)
+            self._bump("seconds_saved", row[1])
+        return row[0]
+
+    def get(self, query: str, embed: Optional[Callable[[], Sequence[float]]] = None) -> Optional[str]:
+        """Cached answer for `query`, or None.
+
+        Tries the exact match first; `embed()` (the query embedding) is only
+        called when that misses and there are entries to compare against.
+        """
+        normalized = normalize_query(query)
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            answer = self._hit(self._key(normalized), "exact_hits", cutoff)
+            if answer is not None:
+                return answer
+
+            if embed is not None:
+                keys, matrix = self._semantic_matrix(cutoff)
+                query_vector = np.asarray(embed(), dtype=np.float32) if len(keys) else None
+                if query_vector is not None and matrix.shape[1] == query_vector.shape[0]:
+                    norm = np.linalg.norm(query_vector)
+                    similarities = matrix @ (query_vector / norm) if norm else np.zeros(len(keys))
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        answer = self._hit(keys[best], "semantic_hits", cutoff)
+                        if answer is not None:
+                            return answer
+
+            self._bump("misses")
+            return None
+
+    def put(self, query: str, answer: str, embedding: Optional[Sequence[float]] = None,
+            generation_seconds: float = 0.0, model: Optional[str] = None):
+        blob = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            blob = (vector / norm if norm else vector).tobytes()
+        now = time.time()
+        with self._lock:
+            with self._transaction():
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, corpus_version, query, embedding, answer, model, generation_seconds, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self._key(normalize_query(query)), self.corpus_version, query, blob, answer, model, generation_seconds, now, now),
+                )
+                self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+                self._conn.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            # data_version only tracks other connections' commits.
+            self._matrix_data_version = None
+
+    def get_or_generate(self, query: str, generate: Callable[[], str], embed: Optional[Callable[[], Sequence[float]]] = None,
+                        model: Optional[str] = None) -> str:
+        """Cached answer, or `generate()` timed and stored. Exceptions from `generate` are not cached."""
+        embedding = []
+
+        def embed_once():
+            if not embedding:
+                embedding.append(embed())
+            return embedding[0]
+
+        answer = self.get(query, embed_once if embed else None)
+        if answer is not None:
+            return answer
+        start = time.perf_counter()
+        answer = generate()
+        self.put(query, answer, embed_once() if embed else None, time.perf_counter() - start, model)
+        return answer
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._matrix_data_version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            values = dict(self._conn.execute("SELECT name, value FROM answer_stats").fetchall())
+            entries = dict(self._conn.execute(
+                "SELECT corpus_version, count(*) FROM answers GROUP BY corpus_version"
+            ).fetchall())
+        hits = values["exact_hits"] + values["semantic_hits"]
+        lookups = hits + values["misses"]
+        return {
+            "corpus_version": self.corpus_version,
+            "entries": entries.get(self.corpus_version, 0),
+            "total_entries": sum(entries.values()),
+            "exact_hits": int(values["exact_hits"]),
+            "semantic_hits": int(values["semantic_hits"]),
+            "misses": int(values["misses"]),
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "seconds_saved": round(values["seconds_saved"], 3),
+        }
@@ -0,0 +1,78 @@
+"""Async handlers for the DB-bound endpoints, used when DB_ASYNC is enabled.
+
+main.py includes this router ahead of its own sync handlers, and FastAPI
+matches routes in registration order, so these take over the same paths.
+"""
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from database import get_async_db
+import schemas, crud, crud_async, catalog, http_cache
+from serializers import JSONBytesResponse
+
+router = APIRouter()
+
+
+@router.get("/api/routes", summary="Search for buses by origin and destination using query parameters",
+            response_class=JSONBytesResponse, responses={200: {"model": List[schemas.BusRoute]}})
+async def search_buses(request: Request):
+    route_catalog = catalog.current()
+    if route_catalog is not None:
+        origin = request.query_params.get("origin")
+        destination = request.query_params.get("destination")
+        if not origin or not destination:
+            raise HTTPException(status_code=400, detail="Please provide both 'origin' and 'destination' query parameters.")
+        return http_cache.cached_json(
+            request,
+            route_catalog.search_json(origin, destination),
+            route_catalog.search_etag(origin, destination),
+            route_catalog,
+        )
+
+    # Catalog not loaded (e.g. ingestion failed at startup): fall back to SQL.
+    async with database.AsyncSessionLocal() as db:
+        routes = await crud_async.get_buses_by_route(db, request)
+    return JSONBytesResponse(routes)
+
+
+@router.post("/api/book_ticket", response_model=schemas.Booking, status_code=status.HTTP_201_CREATED)
+async def book_ticket(booking: schemas.BookingCreate, db: AsyncSession = Depends(get_async_db)):
+    route = crud.require_live_route(await crud_async.get_route(db, booking.route_id))
+
+    return await crud_async.create_booking(db, booking=booking, route=route)
+
+
+@router.get("/api/routes/{route_id}/seats", response_model=schemas.SeatAvailability)
+async def route_seats(route_id: int, db: AsyncSession = Depends(get_async_db)):
+    route = crud.require_live_route(await crud_async.get_route(db, route_id))
+
+    available = await crud_async.available_seats(db, route)
+    return {"route_id": route_id, "total_seats": route.total_seats, "available_seats": available}
+
+
+@router.get("/api/bookings/{phone}", summary="Page through a phone's bookings, newest first",
+            response_class=JSONBytesResponse, responses={200: {"model": schemas.BookingPage}})
+async def view_bookings(
+    phone: str,
+    before_id: Optional[int] = Query(None, ge=1, description="Return bookings older than this one (the previous page's next_before_id)"),
+    limit: int = Query(50, ge=1, le=500),
+    booking_status: Optional[Literal["Booked", "Canceled"]] = Query(None, alias="status"),
+    compact: bool = Query(False, description="Leave out the embedded route"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    bookings, next_before_id = await crud_async.get_bookings_by_phone(
+        db, user_phone=phone, before_id=before_id, limit=limit, status=booking_status, compact=compact
+    )
+    return JSONBytesResponse({"bookings": bookings, "next_before_id": next_before_id})
+
+
+@router.post("/api/cancel_booking/{booking_id}", response_model=schemas.Booking)
+async def cancel_booking_endpoint(booking_id: int, db: AsyncSession = Depends(get_async_db)):
+    cancelled_booking = await crud_async.cancel_booking(db, booking_id=booking_id)
+    if not cancelled_booking:
+        raise HTTPException(status_code=404, detail="Booking not found.")
+
+    return cancelled_booking
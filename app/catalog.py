@@ -0,0 +1,116 @@
+import hashlib
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models, serializers, metrics
+
+
+class RouteRecord:
+    """Read-only route row held by the in-memory catalog."""
+
+    __slots__ = ("id", "provider_name", "origin", "destination", "departure_time", "dropping_point", "fare", "total_seats")
+
+    def __init__(self, id, provider_name, origin, destination, departure_time, dropping_point, fare, total_seats):
+        self.id = id
+        self.provider_name = provider_name
+        self.origin = origin
+        self.destination = destination
+        self.departure_time = departure_time
+        self.dropping_point = dropping_point
+        self.fare = fare
+        self.total_seats = total_seats
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RouteCatalog:
+    """Immutable (origin_id, destination_id) -> routes index built from bus_routes."""
+
+    __slots__ = ("version", "content_hash", "routes", "district_ids", "size", "_encoded")
+
+    def __init__(self, version: int, routes: Dict[Tuple[int, int], Tuple[RouteRecord, ...]], district_ids: Dict[str, int], content_hash: str = ""):
+        self.version = version
+        # Digest of every route row; identical catalogs hash the same in every worker and across restarts.
+        self.content_hash = content_hash
+        self.routes = routes
+        self.district_ids = district_ids
+        self.size = sum(len(r) for r in routes.values())
+        # JSON body per city pair, encoded on first request. The catalog never
+        # changes after construction, so the bytes stay valid for its lifetime.
+        self._encoded: Dict[Tuple[int, int], bytes] = {}
+
+    def _pair(self, origin: str, destination: str):
+        return self.district_ids.get(models.normalize_key(origin)), self.district_ids.get(models.normalize_key(destination))
+
+    def search(self, origin: str, destination: str) -> Tuple[RouteRecord, ...]:
+        return self.routes.get(self._pair(origin, destination), ())
+
+    def etag(self, *parts) -> str:
+        """Strong ETag for a response derived only from this catalog and `parts`."""
+        request_hash = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+        return f'"{self.content_hash}-{request_hash}"'
+
+    def search_etag(self, origin: str, destination: str) -> str:
+        origin_id, destination_id = self._pair(origin, destination)
+        return self.etag("routes", origin_id, destination_id)
+
+    def search_json(self, origin: str, destination: str) -> bytes:
+        pair = self._pair(origin, destination)
+        body = self._encoded.get(pair)
+        if body is None:
+            records = self.routes.get(pair)
+            if records is None:
+                return b"[]"
+            with metrics.span("serialize"):
+                body = serializers.dumps([r.as_dict() for r in records])
+            self._encoded[pair] = body
+        return body
+
+
+_catalog: Optional[RouteCatalog] = None
+_rebuild_lock = threading.Lock()
+
+
+def build_catalog(db: Session, version: int) -> RouteCatalog:
+    table = models.BusRoute.__table__
+    stmt = models.route_select(table.c.origin_id, table.c.destination_id)
+
+    grouped: Dict[Tuple[int, int], list] = {}
+    intern = sys.intern
+    digest = hashlib.blake2b(digest_size=8)
+    for row in db.execute(stmt):
+        digest.update(repr(tuple(row)).encode())
+        grouped.setdefault((row[8], row[9]), []).append(RouteRecord(
+            row[0],
+            intern(row[1]),
+            intern(row[2]),
+            intern(row[3]),
+            row[4],
+            intern(row[5]),
+            row[6],
+            row[7] if row[7] is not None else 40,
+        ))
+
+    district_ids = dict(db.execute(select(models.District.key, models.District.id)).all())
+    digest.update(repr(sorted(district_ids.items())).encode())
+    return RouteCatalog(version, {key: tuple(records) for key, records in grouped.items()}, district_ids, digest.hexdigest())
+
+
+def rebuild(db: Session) -> RouteCatalog:
+    """Build a new catalog with the next version and swap it in as a single reference assignment."""
+    global _catalog
+    with _rebuild_lock:
+        version = _catalog.version + 1 if _catalog is not None else 1
+        new_catalog = build_catalog(db, version)
+        _catalog = new_catalog
+    print(f"Route catalog v{new_catalog.version} loaded: {new_catalog.size} routes, {len(new_catalog.routes)} city pairs.")
+    return new_catalog
+
+
+def current() -> Optional[RouteCatalog]:
+    return _catalog
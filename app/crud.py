@@ -1,48 +1,27 @@
-import json
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from models import BusRoute
-import models, schemas
+from typing import Iterator, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import models, schemas, ingest, catalog, seats, serializers, metrics
 from fastapi import Request, HTTPException
 
-def ingest_routes_from_json(db: Session, json_filepath: str = "../data/data.json"):
-    data = {}
-    with open(json_filepath, 'r') as f:
-        data.update(json.load(f))
-        
-    routes = []
-    district_lookup = {d["name"]: d["dropping_points"] for d in data["districts"]}
-    
-    db.query(models.BusRoute).delete()
-    db.commit()
-    
-    for provider in data["bus_providers"]:
-
-        provider_name = provider["name"]
-        covered = provider["coverage_districts"]
-        
-        for origin in covered:
-            for destination in covered:
-                if origin == destination:
-                    continue
-
-                dropping_points = district_lookup[destination]
-
-                for dp in dropping_points:
-                    route = {
-                        "provider_name": provider_name,
-                        "origin": origin,
-                        "destination": destination,
-                        "dropping_point": dp["name"],
-                        "fare": dp["price"]
-                    }
-                    
-                    routes.append(route)
-
-    
-    db.add_all([BusRoute(**route) for route in routes])
-    db.commit()
-    print(f"Successfully ingested {len(routes)} bus routes.")
+def ingest_routes_from_json(db: Session, json_filepath: str = "../data/data.json", batch_size: int = ingest.DEFAULT_BATCH_SIZE):
+    data = ingest.load_catalog(json_filepath)
+    stats = ingest.sync_catalog(db, data, batch_size=batch_size)
+    print(
+        f"Route ingestion: {stats['seen']} routes ({stats['inserted']} inserted, {stats['updated']} updated, "
+        f"{stats['deleted']} deleted, {stats['kept_with_bookings']} stale kept for bookings, "
+        f"{stats['retired']} newly retired, {stats['restored']} restored) "
+        f"in {stats['seconds']}s, {stats['rows_per_sec']} rows/s, peak RSS {stats['peak_rss_mb']} MiB."
+    )
+    catalog.rebuild(db)
+    return stats
+
+
+def district_id_subquery(name: str):
+    """Scalar subquery resolving a typed district name to its id (evaluated once per statement)."""
+    return select(models.District.id).where(models.District.key == models.normalize_key(name)).scalar_subquery()
 
 
 def get_buses_by_route(db: Session, request: Request):
@@ -50,19 +29,71 @@ def get_buses_by_route(db: Session, request: Request):
     destination = request.query_params.get("destination")
     if not origin or not destination:
         raise HTTPException(status_code=400, detail="Please provide both 'origin' and 'destination' query parameters.")
-    
-    return db.query(models.BusRoute).filter(
-        func.lower(models.BusRoute.origin) == origin.lower(),
-        func.lower(models.BusRoute.destination) == destination.lower()
-    ).all()
-
-def create_booking(db: Session, booking: schemas.BookingCreate):
-    
+
+    stmt = models.route_select().where(
+        models.BusRoute.origin_id == district_id_subquery(origin),
+        models.BusRoute.destination_id == district_id_subquery(destination),
+    )
+    result = db.execute(stmt)
+    with metrics.span("hydrate"):
+        return [dict(row._mapping) for row in result]
+
+ROUTE_COLUMNS = ("id", "provider_name", "origin", "destination", "departure_time", "dropping_point", "fare", "total_seats")
+
+
+def _routes_select(origin: Optional[str] = None, provider: Optional[str] = None):
+    stmt = models.route_select()
+    if origin:
+        stmt = stmt.where(models.BusRoute.origin_id == district_id_subquery(origin))
+    if provider:
+        stmt = stmt.where(models.BusRoute.provider_id == (
+            select(models.Provider.id).where(models.Provider.name == provider.strip()).scalar_subquery()
+        ))
+    return stmt
+
+
+def get_routes_page(db: Session, after_id: int = 0, limit: int = 500, origin: Optional[str] = None, provider: Optional[str] = None):
+    """One keyset page of routes with id > after_id, plus the cursor for the next page (None when done)."""
+    stmt = _routes_select(origin, provider).where(models.BusRoute.__table__.c.id > after_id).limit(limit + 1)
+    result = db.execute(stmt)
+    with metrics.span("hydrate"):
+        rows = [dict(zip(ROUTE_COLUMNS, row)) for row in result]
+    next_after_id = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1]["id"]
+    return rows, next_after_id
+
+
+def stream_routes_ndjson(engine: Engine, origin: Optional[str] = None, provider: Optional[str] = None, batch_size: int = 1000) -> Iterator[bytes]:
+    """Yield the route catalog as newline-delimited JSON from a server-side cursor."""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(_routes_select(origin, provider))
+        for partition in result.partitions():
+            yield b"".join(serializers.dumps(dict(zip(ROUTE_COLUMNS, row))) + b"\n" for row in partition)
+
+
+def require_live_route(route: Optional[models.BusRoute]) -> models.BusRoute:
+    """404 for an unknown route, 410 for one retired by ingest (kept only for its existing bookings)."""
+    if route is None:
+        raise HTTPException(status_code=404, detail="Bus route not found.")
+    if route.retired_at is not None:
+        raise HTTPException(status_code=410, detail="This bus route has been discontinued.")
+    return route
+
+
+def create_booking(db: Session, booking: schemas.BookingCreate, route: models.BusRoute):
+    user_phone = models.normalize_phone(booking.user_phone)
+    if not user_phone:
+        raise HTTPException(status_code=400, detail="Please provide a valid phone number.")
+    # Claim first: raises 400/409 and leaves nothing behind if the seat is invalid or taken.
+    seat_number = seats.claim_seat(db, route, booking.seat_number)
+
     db_booking = models.Booking(
         route_id=booking.route_id,
         user_name=booking.user_name,
-        user_phone=booking.user_phone,
-        seat_number=booking.seat_number,
+        user_phone=user_phone,
+        seat_number=seat_number,
         status="Booked"
     )
     db.add(db_booking)
@@ -70,22 +101,72 @@ def create_booking(db: Session, booking: schemas.BookingCreate):
     db.refresh(db_booking)
     return db_booking
 
-def get_bookings_by_phone(db: Session, user_phone: str):
-    if not user_phone:
-        return []
+BOOKING_FIELDS = ("id", "route_id", "user_name", "user_phone", "seat_number", "booking_time", "status")
+
+
+def bookings_select(user_phone: str, before_id: Optional[int] = None, status: Optional[str] = None, limit: Optional[int] = None):
+    """A phone's bookings, newest first, starting after booking `before_id`; fetches one extra row to detect a next page."""
+    table = models.Booking.__table__
+    stmt = select(*(table.c[name] for name in BOOKING_FIELDS)).where(table.c.user_phone == models.normalize_phone(user_phone))
+    if status:
+        stmt = stmt.where(table.c.status == status)
+    if before_id is not None:
+        # Compare against the cursor row's stored time rather than a bound datetime: SQLite keeps
+        # times as text and server-default ones have no fractional seconds.
+        cursor_time = select(table.c.booking_time).where(table.c.id == before_id).scalar_subquery()
+        stmt = stmt.where(or_(
+            table.c.booking_time < cursor_time,
+            and_(table.c.booking_time == cursor_time, table.c.id < before_id),
+        ))
+    stmt = stmt.order_by(table.c.booking_time.desc(), table.c.id.desc())
+    return stmt.limit(limit + 1) if limit is not None else stmt
+
+
+def split_page(rows, limit: int):
+    """(rows of this page, id of its last row as the next cursor or None when there is no next page)."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1][0]
+    return rows, None
+
+
+def routes_by_id_select(route_ids):
+    # History keeps showing the route of a booking after the route is retired.
+    return models.route_select(include_retired=True).where(models.BusRoute.id.in_(route_ids))
+
+
+def attach_routes(booking_rows, route_rows) -> list:
+    """Booking dicts shaped like schemas.Booking, with each route embedded once looked up."""
+    routes = {row[0]: dict(zip(ROUTE_COLUMNS, row)) for row in route_rows}
+    bookings = serializers.rows_to_dicts(BOOKING_FIELDS, booking_rows)
+    for booking in bookings:
+        booking["route"] = routes.get(booking["route_id"])
+    return bookings
+
+
+def get_bookings_by_phone(db: Session, user_phone: str, before_id: Optional[int] = None, limit: int = 50,
+                          status: Optional[str] = None, compact: bool = False):
+    """One page of a phone's bookings, newest first, plus the cursor for the next page (None when done).
+
+    `compact` leaves out the embedded route, which also skips the route query.
+    """
+    if not models.normalize_phone(user_phone or ""):
+        return [], None
 
-    try:
-        phone_val = user_phone.strip()
-        return db.query(models.Booking).options(joinedload(models.Booking.route)).filter(
-            models.Booking.user_phone == phone_val
-        ).all()
-    except Exception as e:
-        print(f"Error retrieving bookings for phone {user_phone}: {e}")
-        return []
+    booking_rows, next_before_id = split_page(db.execute(bookings_select(user_phone, before_id, status, limit)).all(), limit)
+    if compact:
+        with metrics.span("hydrate"):
+            return serializers.rows_to_dicts(BOOKING_FIELDS, booking_rows), next_before_id
+    route_ids = {row[1] for row in booking_rows if row[1] is not None}
+    route_rows = db.execute(routes_by_id_select(route_ids)).all() if route_ids else []
+    with metrics.span("hydrate"):
+        return attach_routes(booking_rows, route_rows), next_before_id
 
 def cancel_booking(db: Session, booking_id: int):
     db_booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
     if db_booking:
+        if db_booking.status == "Booked" and db_booking.route is not None:
+            seats.release_seat(db, db_booking.route, db_booking.seat_number)
         db_booking.status = "Canceled"
         db.commit()
         db.refresh(db_booking)
@@ -0,0 +1,63 @@
+"""AsyncSession equivalents of the functions in crud.py.
+
+Reads are native async queries. Writes reuse the sync implementations through
+`AsyncSession.run_sync`, so seat claims keep exactly one code path.
+"""
+from fastapi import Request, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models, schemas, crud, seats, serializers
+
+
+async def get_buses_by_route(db: AsyncSession, request: Request):
+    origin = request.query_params.get("origin")
+    destination = request.query_params.get("destination")
+    if not origin or not destination:
+        raise HTTPException(status_code=400, detail="Please provide both 'origin' and 'destination' query parameters.")
+
+    result = await db.execute(
+        models.route_select().where(
+            models.BusRoute.origin_id == crud.district_id_subquery(origin),
+            models.BusRoute.destination_id == crud.district_id_subquery(destination),
+        )
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def get_route(db: AsyncSession, route_id: int):
+    return await db.get(models.BusRoute, route_id)
+
+
+def _with_route(fn):
+    """Run a sync crud writer and load the booking's route before leaving the sync context."""
+    def wrapper(db, *args, **kwargs):
+        db_booking = fn(db, *args, **kwargs)
+        if db_booking is not None:
+            db_booking.route
+        return db_booking
+    return wrapper
+
+
+async def create_booking(db: AsyncSession, booking: schemas.BookingCreate, route: models.BusRoute):
+    return await db.run_sync(_with_route(crud.create_booking), booking, route)
+
+
+async def get_bookings_by_phone(db: AsyncSession, user_phone: str, before_id=None, limit: int = 50, status=None, compact: bool = False):
+    if not models.normalize_phone(user_phone or ""):
+        return [], None
+
+    result = await db.execute(crud.bookings_select(user_phone, before_id, status, limit))
+    booking_rows, next_before_id = crud.split_page(result.all(), limit)
+    if compact:
+        return serializers.rows_to_dicts(crud.BOOKING_FIELDS, booking_rows), next_before_id
+    route_ids = {row[1] for row in booking_rows if row[1] is not None}
+    route_rows = (await db.execute(crud.routes_by_id_select(route_ids))).all() if route_ids else []
+    return crud.attach_routes(booking_rows, route_rows), next_before_id
+
+
+async def cancel_booking(db: AsyncSession, booking_id: int):
+    return await db.run_sync(_with_route(crud.cancel_booking), booking_id)
+
+
+async def available_seats(db: AsyncSession, route: models.BusRoute):
+    return await db.run_sync(seats.available_seats, route)
@@ -1,16 +1,145 @@
 import os
-from sqlalchemy import create_engine
+from typing import Callable, List
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-engine = create_engine("sqlite:///businfo.db", connect_args={"check_same_thread": False})
+import metrics
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///businfo.db")
+# Serve the DB-bound endpoints from async handlers over an AsyncSession.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# SQLite: WAL lets readers run alongside a writer; NORMAL sync is durable in WAL
+# except for the last transactions on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+# Postgres pool and server-side limits.
+PG_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+PG_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+PG_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+PG_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+# Extra per-connection setup, called as hook(dbapi_connection, backend_name).
+_connect_hooks: List[Callable] = []
+
+
+def on_connect(hook: Callable):
+    """Register a function to run on every new DBAPI connection (usable as a decorator)."""
+    _connect_hooks.append(hook)
+    return hook
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync URL to its async driver: aiosqlite for SQLite, asyncpg for Postgres."""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+    if backend not in drivers:
+        raise ValueError(f"No async driver configured for '{backend}' databases.")
+    return f"{drivers[backend]}://{rest}"
+
+
+def _apply_sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return {} if is_async else {"connect_args": {"check_same_thread": False}}
+    if backend == "postgresql":
+        if is_async:
+            connect_args = {"server_settings": {"statement_timeout": str(PG_STATEMENT_TIMEOUT_MS)}}
+        else:
+            connect_args = {"options": f"-c statement_timeout={PG_STATEMENT_TIMEOUT_MS}"}
+        return {
+            "pool_size": PG_POOL_SIZE,
+            "max_overflow": PG_MAX_OVERFLOW,
+            "pool_pre_ping": True,
+            "pool_recycle": PG_POOL_RECYCLE,
+            "connect_args": connect_args,
+        }
+    return {}
+
+
+def _install_connect_hooks(sync_engine: Engine):
+    backend = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if backend == "sqlite":
+            _apply_sqlite_pragmas(dbapi_connection)
+        for hook in _connect_hooks:
+            hook(dbapi_connection, backend)
+
+
+def make_engine(url: str = DATABASE_URL) -> Engine:
+    """Sync engine for `url` with the backend-specific pool settings and connect hooks."""
+    engine = create_engine(url, **_engine_options(url, is_async=False))
+    _install_connect_hooks(engine)
+    metrics.instrument_engine(engine)
+    return engine
+
+
+def make_async_engine(url: str = DATABASE_URL):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = async_database_url(url)
+    async_engine = create_async_engine(async_url, **_engine_options(async_url, is_async=True))
+    _install_connect_hooks(async_engine.sync_engine)
+    metrics.instrument_engine(async_engine)
+    return async_engine
+
+
+def describe_engine(engine: Engine) -> dict:
+    """Effective settings as reported by the database, for the startup self-check."""
+    info = {"url": engine.url.render_as_string(hide_password=True), "backend": engine.dialect.name}
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            for name in SQLITE_PRAGMAS:
+                info[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        elif engine.dialect.name == "postgresql":
+            info["statement_timeout"] = conn.execute(text("SHOW statement_timeout")).scalar()
+            info["pool_size"] = engine.pool.size()
+            info["max_overflow"] = PG_MAX_OVERFLOW
+    return info
+
+
+engine = make_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = make_async_engine(DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
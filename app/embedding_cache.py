@@ -0,0 +1,201 @@
+"""Persistent, content-addressed cache in front of an embedding model.
+
+Vectors live in one SQLite file (WAL mode) under the cache directory, one row
+per cached text, so the API, the Streamlit chatbot and ``vector_ingest.py``
+can share a directory: every write is a transaction and no process hands out
+storage another process is using. A key is a hash of the model name, the kind
+of embedding (document or query) and the whitespace-normalized text, so
+re-ingesting unchanged chunks or repeating a question costs no embedding calls.
+"""
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import metrics
+
+DB_FILE = "embeddings.db"
+# Last-used times of cache hits are written at most this often; new vectors are written immediately.
+FLUSH_INTERVAL_SECONDS = 5.0
+# Keys per SELECT, below SQLite's bound-parameter limit.
+LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used_at);
+"""
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_key(model: str, kind: str, text: str) -> str:
+    return hashlib.blake2b(f"{model}\0{kind}\0{normalize_text(text)}".encode(), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """LRU-bounded key -> float32 vector store under `path`."""
+
+    def __init__(self, path: str, capacity: int = 100_000):
+        self.path = path
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, DB_FILE), timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT length(vector) FROM embeddings LIMIT 1").fetchone()
+        self.dim: Optional[int] = row[0] // 4 if row else None
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # -- persistence -------------------------------------------------------
+
+    def _write_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used_at = ? WHERE key = ? AND last_used_at < ?",
+                [(used, key, used) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def flush(self):
+        """Write the last-used times of cache hits, which decide what is evicted first."""
+        with self._lock:
+            if self._touched:
+                with self._transaction():
+                    self._write_touched()
+            self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if self._touched and time.monotonic() - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+            self.flush()
+
+    # -- lookups -----------------------------------------------------------
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            found: Dict[str, bytes] = {}
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), LOOKUP_CHUNK):
+                chunk = unique[i:i + LOOKUP_CHUNK]
+                found.update(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            now = time.time()
+            result = []
+            for key in keys:
+                blob = found.get(key)
+                if blob is None:
+                    self.misses += 1
+                    result.append(None)
+                else:
+                    self.hits += 1
+                    self._touched[key] = now
+                    result.append(np.frombuffer(blob, dtype=np.float32))
+            return result
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        if not keys:
+            return
+        now = time.time()
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(vectors[0])
+            rows = []
+            for i, (key, vector) in enumerate(zip(keys, vectors)):
+                if len(vector) != self.dim:
+                    raise ValueError(f"Embedding has {len(vector)} dimensions, cache holds {self.dim}.")
+                # Later items of a batch count as more recently used, so eviction order is deterministic.
+                rows.append((key, np.asarray(vector, dtype=np.float32).tobytes(), now + i * 1e-6))
+            with self._transaction():
+                # Hits first, so entries this process just used are not the ones evicted.
+                self._write_touched()
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used_at) VALUES (?, ?, ?)", rows)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.capacity,),
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+class CachedEmbeddings:
+    """LangChain-compatible embeddings wrapper that consults an EmbeddingCache first."""
+
+    def __init__(self, inner, cache: EmbeddingCache, model_name: Optional[str] = None):
+        self.inner = inner
+        self.cache = cache
+        self.model_name = model_name or getattr(inner, "model", None) or getattr(inner, "model_name", None) or type(inner).__name__
+
+    def _embed(self, kind: str, texts: List[str], embed_fn, flush) -> List[List[float]]:
+        with metrics.span("embedding"):
+            return self._embed_cached(kind, texts, embed_fn, flush)
+
+    def _embed_cached(self, kind: str, texts: List[str], embed_fn, flush) -> List[List[float]]:
+        keys = [cache_key(self.model_name, kind, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text, vector in zip(keys, texts, found):
+            if vector is None and key not in missing:
+                missing[key] = text
+        if missing:
+            computed = embed_fn(list(missing.values()))
+            self.cache.put_many(list(missing.keys()), computed)
+            flush()
+            fresh = dict(zip(missing.keys(), computed))
+            found = [fresh[key] if vector is None else vector for key, vector in zip(keys, found)]
+
+        return [vector.tolist() if isinstance(vector, np.ndarray) else list(vector) for vector in found]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts, self.inner.embed_documents, self.cache.flush)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text], lambda batch: [self.inner.embed_query(batch[0])], self.cache.maybe_flush)[0]
+
+    def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        batch = getattr(self.inner, "embed_queries", None)
+        if batch is not None:
+            return batch(texts)
+        return [self.inner.embed_query(text) for text in texts]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query embeddings for many questions; only the uncached ones reach the backend, in one batch."""
+        return self._embed("query", texts, self._embed_query_batch, self.cache.maybe_flush)
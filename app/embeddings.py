@@ -0,0 +1,171 @@
+"""Embedding backends for ingestion and query time, selected by EMBEDDING_BACKEND.
+
+- ``gemini``: GoogleGenerativeAIEmbeddings (remote, needs GOOGLE_API_KEY).
+- ``sentence-transformers``: a local model, embedded in batches on CPU/GPU.
+- ``hashing``: a NumPy hashing vectorizer; no model download, fully deterministic.
+
+Every backend exposes the LangChain ``embed_documents``/``embed_query`` pair,
+plus ``embed_queries`` for many questions in one call, and is wrapped in the
+on-disk embedding cache. Each backend writes to its own
+collection and cache directory because their vectors are not comparable.
+"""
+import os
+import re
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+load_dotenv()
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini").lower()
+# Overrides the backend's default model (ignored by the hashing backend).
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_HASHING_DIM = int(os.getenv("EMBEDDING_HASHING_DIM", "1024"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "../data/embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "100000"))
+
+BACKENDS = ("gemini", "sentence-transformers", "hashing")
+DEFAULT_MODELS = {
+    "gemini": "models/gemini-embedding-001",
+    "sentence-transformers": "sentence-transformers/all-MiniLM-L6-v2",
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class GeminiEmbeddings:
+    """GoogleGenerativeAIEmbeddings with batched query embedding (one request per 100 queries)."""
+
+    def __init__(self, model: str = DEFAULT_MODELS["gemini"]):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.model = model
+        self._client = GoogleGenerativeAIEmbeddings(model=model)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._client.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._client.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+
+
+class SentenceTransformerEmbeddings:
+    """Local sentence-transformers model; documents are encoded `batch_size` at a time."""
+
+    def __init__(self, model: str = DEFAULT_MODELS["sentence-transformers"], batch_size: int = EMBEDDING_BATCH_SIZE, device: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = model
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model, device=device)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+class HashingEmbeddings:
+    """Signed feature hashing of word unigrams and bigrams with sublinear TF, L2-normalized.
+
+    Stateless, so documents and queries can be embedded independently and the
+    same text always maps to the same vector in every process.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_HASHING_DIM):
+        self.dim = dim
+        self.model = f"hashing-v1-{dim}"
+
+    def _features(self, text: str) -> List[int]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(gram.encode()) for gram in grams]
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(self._features(text), dtype=np.uint32)
+            if not hashes.size:
+                continue
+            # Low bits pick the bucket, the top bit the sign, so collisions tend to cancel.
+            signs = np.where(hashes >> 31, -1.0, 1.0)
+            counts = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+            matrix[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+
+def make_backend(backend: str = EMBEDDING_BACKEND, model: Optional[str] = EMBEDDING_MODEL):
+    """Uncached embeddings object for `backend` and the model name used in cache keys."""
+    if backend == "gemini":
+        inner = GeminiEmbeddings(model or DEFAULT_MODELS["gemini"])
+        return inner, inner.model
+    if backend == "sentence-transformers":
+        inner = SentenceTransformerEmbeddings(model or DEFAULT_MODELS["sentence-transformers"])
+        return inner, inner.model
+    if backend == "hashing":
+        inner = HashingEmbeddings()
+        return inner, inner.model
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Choose one of: {', '.join(BACKENDS)}.")
+
+
+def embed_queries(embedding_function, texts: List[str]) -> List[List[float]]:
+    """Query embeddings for `texts`, in one batched call when the embeddings object supports it."""
+    batch = getattr(embedding_function, "embed_queries", None)
+    if batch is not None:
+        return batch(texts)
+    return [embedding_function.embed_query(text) for text in texts]
+
+
+def collection_name(base: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """Gemini keeps the original collection; other backends get their own."""
+    return base if backend == "gemini" else f"{base}_{backend.replace('-', '_')}"
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache:
+    """One on-disk cache per model and process, shared by ingestion and query embedding."""
+    cache = _caches.get(model_name)
+    if cache is None:
+        directory = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        cache = _caches[model_name] = EmbeddingCache(os.path.join(EMBEDDING_CACHE_PATH, directory), capacity=EMBEDDING_CACHE_SIZE)
+    return cache
+
+
+_functions: Dict[tuple, CachedEmbeddings] = {}
+
+
+def get_embedding_function(backend: str = EMBEDDING_BACKEND, model: Optional[str] = EMBEDDING_MODEL) -> CachedEmbeddings:
+    """Cached embeddings for `backend`, created once per process (local models load only once)."""
+    function = _functions.get((backend, model))
+    if function is None:
+        inner, model_name = make_backend(backend, model)
+        function = _functions[(backend, model)] = CachedEmbeddings(inner, get_embedding_cache(model_name), model_name)
+    return function
@@ -0,0 +1,40 @@
+"""Conditional GET support (ETag / If-None-Match) for catalog endpoints."""
+import os
+
+from fastapi import Request, Response, status
+
+from serializers import JSONBytesResponse
+
+# Clients may reuse a catalog response for this long, then must revalidate.
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}, must-revalidate"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x".
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def cache_headers(etag: str, route_catalog) -> dict:
+    # X-Catalog-Version is the content hash so it agrees across workers and restarts.
+    return {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL, "X-Catalog-Version": route_catalog.content_hash}
+
+
+def not_modified(request: Request, etag: str, route_catalog):
+    """A 304 response if the client already holds `etag`, else None."""
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, route_catalog))
+    return None
+
+
+def cached_json(request: Request, content, etag: str, route_catalog) -> Response:
+    """304 for a matching If-None-Match, otherwise the JSON body with validators attached."""
+    return not_modified(request, etag, route_catalog) or JSONBytesResponse(
+        content, headers=cache_headers(etag, route_catalog)
+    )
@@ -0,0 +1,254 @@
+import json
+import sys
+import time
+from typing import Dict, Iterable, Iterator
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+import models
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Columns that identify a route across re-ingests. Everything else on the row
+# is payload that may be updated in place while the route keeps its id.
+ROUTE_KEY = ("provider_id", "origin_id", "destination_id", "dropping_point_id")
+ROUTE_PAYLOAD = ("fare",)
+
+
+def load_catalog(json_filepath: str) -> dict:
+    with open(json_filepath, "r") as f:
+        return json.load(f)
+
+
+def _ensure_rows(db: Session, table, key_columns, rows):
+    """Insert rows whose key is not present yet; return {key tuple: id} for the whole table."""
+    key_cols = [table.c[name] for name in key_columns]
+    existing = {tuple(row[1:]): row[0] for row in db.execute(select(table.c.id, *key_cols))}
+    missing = [row for row in rows if tuple(row[name] for name in key_columns) not in existing]
+    if missing:
+        db.execute(insert(table), missing)
+        existing = {tuple(row[1:]): row[0] for row in db.execute(select(table.c.id, *key_cols))}
+    return existing
+
+
+def sync_dimensions(db: Session, data: dict) -> dict:
+    """Upsert providers, districts, dropping points and coverage; return name -> id lookups.
+
+    Dimension rows that disappear from the catalog are left in place since
+    routes kept for existing bookings may still point at them.
+    """
+    district_names = {d["name"] for d in data["districts"]}
+    for provider in data["bus_providers"]:
+        district_names.update(provider["coverage_districts"])
+
+    providers = _ensure_rows(
+        db, models.Provider.__table__, ("name",), [{"name": p["name"]} for p in data["bus_providers"]]
+    )
+    districts = _ensure_rows(
+        db, models.District.__table__, ("name",),
+        [{"name": name, "key": models.normalize_key(name)} for name in sorted(district_names)],
+    )
+
+    points_table = models.DroppingPoint.__table__
+    wanted_points = {
+        (districts[(d["name"],)], dp["name"]): dp["price"]
+        for d in data["districts"]
+        for dp in d["dropping_points"]
+    }
+    points = _ensure_rows(
+        db, points_table, ("district_id", "name"),
+        [{"district_id": k[0], "name": k[1], "price": price} for k, price in wanted_points.items()],
+    )
+    current_prices = dict(db.execute(select(points_table.c.id, points_table.c.price)).all())
+    changed = [
+        {"point_id": points[key], "price": price}
+        for key, price in wanted_points.items()
+        if current_prices.get(points[key]) != price
+    ]
+    if changed:
+        db.execute(
+            update(points_table).where(points_table.c.id == bindparam("point_id")).values(price=bindparam("price")),
+            changed,
+        )
+
+    coverage_table = models.ProviderCoverage.__table__
+    wanted_coverage = {
+        (providers[(p["name"],)], districts[(name,)])
+        for p in data["bus_providers"]
+        for name in p["coverage_districts"]
+    }
+    current_coverage = set(db.execute(select(coverage_table.c.provider_id, coverage_table.c.district_id)).all())
+    added = wanted_coverage - current_coverage
+    removed = current_coverage - wanted_coverage
+    if added:
+        db.execute(insert(coverage_table), [{"provider_id": p, "district_id": d} for p, d in added])
+    for provider_id, district_id in removed:
+        db.execute(
+            delete(coverage_table).where(
+                coverage_table.c.provider_id == provider_id, coverage_table.c.district_id == district_id
+            )
+        )
+
+    return {
+        "providers": {key[0]: id_ for key, id_ in providers.items()},
+        "districts": {key[0]: id_ for key, id_ in districts.items()},
+        "dropping_points": points,
+    }
+
+
+def iter_routes(data: dict, ids: dict) -> Iterator[dict]:
+    """Yield one route row per provider x origin x destination x dropping point."""
+    district_ids = ids["districts"]
+    point_ids = ids["dropping_points"]
+    district_lookup = {d["name"]: d["dropping_points"] for d in data["districts"]}
+
+    for provider in data["bus_providers"]:
+        provider_id = ids["providers"][provider["name"]]
+        covered = provider["coverage_districts"]
+
+        for origin in covered:
+            origin_id = district_ids[origin]
+            for destination in covered:
+                if origin == destination:
+                    continue
+
+                destination_id = district_ids[destination]
+                for dp in district_lookup[destination]:
+                    yield {
+                        "provider_id": provider_id,
+                        "origin_id": origin_id,
+                        "destination_id": destination_id,
+                        "dropping_point_id": point_ids[(destination_id, dp["name"])],
+                        "fare": dp["price"],
+                    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _existing_routes(db: Session):
+    """Map route key -> (id, payload, retired) for every stored route, plus ids of duplicate keys."""
+    table = models.BusRoute.__table__
+    columns = [table.c.id, table.c.retired_at.is_not(None)] + [table.c[name] for name in ROUTE_KEY + ROUTE_PAYLOAD]
+    existing: Dict[tuple, tuple] = {}
+    duplicates = []
+    for row in db.execute(select(*columns).order_by(table.c.id)):
+        key = tuple(row[2:2 + len(ROUTE_KEY)])
+        if key in existing:
+            duplicates.append(row[0])
+        else:
+            existing[key] = (row[0], tuple(row[2 + len(ROUTE_KEY):]), bool(row[1]))
+    return existing, duplicates
+
+
+def sync_routes(db: Session, routes: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Reconcile bus_routes with `routes` without disturbing unchanged rows.
+
+    New routes are bulk inserted, routes whose payload changed are updated in
+    place, and routes no longer produced are deleted. Existing routes keep their
+    ids so `Booking.route_id` stays valid; stale routes that still have bookings
+    are kept but retired (`retired_at` set), so they are no longer searched or
+    booked. A retired route that comes back in the catalog is restored.
+    """
+    table = models.BusRoute.__table__
+    started = time.perf_counter()
+    existing, stale_ids = _existing_routes(db)
+
+    insert_stmt = insert(table)
+    update_stmt = (
+        update(table)
+        .where(table.c.id == bindparam("route_id"))
+        .values({**{name: bindparam(name) for name in ROUTE_PAYLOAD}, "retired_at": None})
+    )
+
+    stats = {"seen": 0, "inserted": 0, "updated": 0, "unchanged": 0, "restored": 0, "deleted": 0,
+             "kept_with_bookings": 0, "retired": 0}
+    inserts, updates = [], []
+
+    def flush():
+        if inserts:
+            db.execute(insert_stmt, inserts)
+            stats["inserted"] += len(inserts)
+            inserts.clear()
+        if updates:
+            db.execute(update_stmt, updates)
+            stats["updated"] += len(updates)
+            updates.clear()
+
+    for route in routes:
+        stats["seen"] += 1
+        key = tuple(route[name] for name in ROUTE_KEY)
+        current = existing.pop(key, None)
+        if current is None:
+            inserts.append(route)
+        else:
+            route_id, payload, retired = current
+            new_payload = tuple(route[name] for name in ROUTE_PAYLOAD)
+            if retired:
+                stats["restored"] += 1
+            if new_payload != payload or retired:
+                updates.append({"route_id": route_id, **dict(zip(ROUTE_PAYLOAD, new_payload))})
+            else:
+                stats["unchanged"] += 1
+
+        if len(inserts) + len(updates) >= batch_size:
+            flush()
+    flush()
+
+    stale_ids.extend(route_id for route_id, _, _ in existing.values())
+    del existing
+    if stale_ids:
+        booked = {
+            route_id
+            for (route_id,) in db.execute(
+                select(models.Booking.route_id).where(models.Booking.route_id.is_not(None)).distinct()
+            )
+        }
+        deletable = [route_id for route_id in stale_ids if route_id not in booked]
+        kept = [route_id for route_id in stale_ids if route_id in booked]
+        stats["kept_with_bookings"] = len(kept)
+        for i in range(0, len(kept), batch_size):
+            result = db.execute(
+                update(table)
+                .where(table.c.id.in_(kept[i:i + batch_size]), table.c.retired_at.is_(None))
+                .values(retired_at=func.now())
+            )
+            stats["retired"] += result.rowcount
+        inventory = models.SeatInventory.__table__
+        for i in range(0, len(deletable), batch_size):
+            batch = deletable[i:i + batch_size]
+            # Seat bitmaps reference the route; left behind they would break the FK and leak into a reused id.
+            db.execute(delete(inventory).where(inventory.c.route_id.in_(batch)))
+            db.execute(delete(table).where(table.c.id.in_(batch)))
+        stats["deleted"] = len(deletable)
+
+    db.commit()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["seen"] / elapsed) if elapsed else None
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return stats
+
+
+def sync_catalog(db: Session, data: dict, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Sync the dimension tables and then the route table from a data.json catalog."""
+    started = time.perf_counter()
+    ids = sync_dimensions(db, data)
+    stats = sync_routes(db, iter_routes(data, ids), batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["seen"] / elapsed) if elapsed else None
+    return stats
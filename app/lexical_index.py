@@ -0,0 +1,227 @@
+"""BM25 keyword index over the RAG chunks, and hybrid retrieval by reciprocal-rank fusion.
+
+The index is built from the vector store's own chunks at ingest time and saved
+next to it (``bm25.npz`` plus ``bm25_documents.json``), so both sides always
+describe the same corpus. BM25 term weights are query independent, so each
+posting stores its final weight and a query only sums postings.
+
+``HybridRetriever.similarity_search`` has the vector store's signature, so
+``rag_engine.RagEngine`` uses it in place of the collection.
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+import metrics
+import vector_index
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+HYBRID_VECTOR_K = int(os.getenv("HYBRID_VECTOR_K", "10"))
+HYBRID_LEXICAL_K = int(os.getenv("HYBRID_LEXICAL_K", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+POSTINGS_FILE = "bm25.npz"
+DOCUMENTS_FILE = "bm25_documents.json"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are any as at be by can do does for from how i in is it me my of on or please show "
+    "that the there this to under what when where which who with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def fusion_key(doc: Document) -> str:
+    """Store id when the backend returns one, otherwise the content hash used as id at ingest."""
+    if getattr(doc, "id", None):
+        return doc.id
+    from vector_ingest import chunk_id
+
+    return chunk_id(doc)
+
+
+class BM25Index:
+    def __init__(self, ids: List[str], texts: List[str], metadatas: List[dict], vocabulary: Dict[str, int],
+                 offsets: np.ndarray, postings: np.ndarray, weights: np.ndarray):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.vocabulary = vocabulary
+        # Postings of term t are postings[offsets[t]:offsets[t + 1]] (document rows) with matching weights.
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+
+    @classmethod
+    def build(cls, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        term_rows: Dict[str, List[int]] = {}
+        term_tfs: Dict[str, List[int]] = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[str, int] = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            lengths[row] = sum(counts.values())
+            for token, tf in counts.items():
+                term_rows.setdefault(token, []).append(row)
+                term_tfs.setdefault(token, []).append(tf)
+
+        n = len(texts)
+        avg_length = float(lengths.mean()) if n else 0.0
+        vocabulary = {term: i for i, term in enumerate(sorted(term_rows))}
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        postings, weights = [], []
+        for term, i in vocabulary.items():
+            rows = np.asarray(term_rows[term], dtype=np.int32)
+            tf = np.asarray(term_tfs[term], dtype=np.float32)
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = k1 * (1 - b + b * lengths[rows] / (avg_length or 1.0))
+            postings.append(rows)
+            weights.append((idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(rows)
+
+        return cls(
+            list(ids), list(texts), [dict(m) for m in metadatas], vocabulary, offsets,
+            np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32),
+            np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32),
+        )
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "BM25Index":
+        stored = vector_store.get(include=["documents", "metadatas"])
+        return cls.build(stored["ids"], stored["documents"], [m or {} for m in stored["metadatas"]])
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        postings_tmp = os.path.join(path, POSTINGS_FILE + ".tmp")
+        documents_tmp = os.path.join(path, DOCUMENTS_FILE + ".tmp")
+        with open(postings_tmp, "wb") as f:
+            np.savez(f, offsets=self.offsets, postings=self.postings, weights=self.weights)
+        with open(documents_tmp, "w") as f:
+            terms = sorted(self.vocabulary, key=self.vocabulary.get)
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas, "terms": terms}, f, ensure_ascii=False)
+        os.replace(postings_tmp, os.path.join(path, POSTINGS_FILE))
+        os.replace(documents_tmp, os.path.join(path, DOCUMENTS_FILE))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """The saved index, or None if `path` has none yet."""
+        documents_path = os.path.join(path, DOCUMENTS_FILE)
+        if not os.path.exists(documents_path):
+            return None
+        with open(documents_path, "r") as f:
+            documents = json.load(f)
+        with np.load(os.path.join(path, POSTINGS_FILE)) as arrays:
+            offsets, postings, weights = arrays["offsets"], arrays["postings"], arrays["weights"]
+        vocabulary = {term: i for i, term in enumerate(documents["terms"])}
+        return cls(documents["ids"], documents["texts"], documents["metadatas"], vocabulary, offsets, postings, weights)
+
+    def _matches(self, row: int, filter: Optional[dict]) -> bool:
+        if not filter:
+            return True
+        metadata = self.metadatas[row]
+        for field, value in filter.items():
+            if field == "$and":
+                if not all(self._matches(row, clause) for clause in value):
+                    return False
+            elif metadata.get(field) not in vector_index.filter_values(value):
+                return False
+        return True
+
+    def search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        with metrics.span("lexical_search"):
+            return self._search(query, k, filter)
+
+    def _search(self, query: str, k: int, filter: Optional[dict]) -> List[Tuple[Document, float]]:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.vocabulary.get(token)
+            if term is not None:
+                start, end = self.offsets[term], self.offsets[term + 1]
+                scores[self.postings[start:end]] += self.weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        results = []
+        for row in order:
+            if self._matches(row, filter):
+                results.append((Document(page_content=self.texts[row], metadata=self.metadatas[row], id=self.ids[row]), float(scores[row])))
+                if len(results) == k:
+                    break
+        return results
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.search_with_score(query, k=k, filter=filter)]
+
+    def batch_search_with_score(self, queries: Sequence[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Tuple[Document, float]]]:
+        # Scoring only sums postings, so there is nothing to share between queries.
+        return [self.search_with_score(query, k=k, filter=filter) for query in queries]
+
+
+def reciprocal_rank_fusion_with_scores(rankings: Sequence[Sequence[Document]], k: int, rrf_k: int = RRF_K) -> List[Tuple[Document, float]]:
+    """Merge ranked lists: each document scores sum(1 / (rrf_k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = fusion_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [(documents[key], scores[key]) for key in best]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    return [doc for doc, _ in reciprocal_rank_fusion_with_scores(rankings, k, rrf_k)]
+
+
+class HybridRetriever:
+    """Vector and BM25 candidates fused by reciprocal rank; a drop-in for the vector store in RagEngine."""
+
+    def __init__(self, vector_store, lexical: BM25Index, vector_k: int = HYBRID_VECTOR_K, lexical_k: int = HYBRID_LEXICAL_K, rrf_k: int = RRF_K):
+        self.vector_store = vector_store
+        self.lexical = lexical
+        self.vector_k = vector_k
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        search_kwargs = {"filter": filter} if filter else {}
+        vector_hits = self.vector_store.similarity_search(query, k=max(k, self.vector_k), **search_kwargs)
+        lexical_hits = self.lexical.similarity_search(query, k=max(k, self.lexical_k), filter=filter)
+        return reciprocal_rank_fusion([vector_hits, lexical_hits], k, self.rrf_k)
+
+    def batch_search_with_score(self, queries: Sequence[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Tuple[Document, float]]]:
+        """Fused (Document, RRF score) lists; the vector side embeds and searches all queries in one batch."""
+        vector_hits = vector_index.batch_search_with_score(self.vector_store, list(queries), k=max(k, self.vector_k), filter=filter)
+        lexical_hits = self.lexical.batch_search_with_score(queries, k=max(k, self.lexical_k), filter=filter)
+        return [
+            reciprocal_rank_fusion_with_scores([[doc for doc, _ in v], [doc for doc, _ in l]], k, self.rrf_k)
+            for v, l in zip(vector_hits, lexical_hits)
+        ]
+
+
+def index_path(store_path: str, collection_name: str) -> str:
+    """Where the BM25 index for a collection lives, inside the vector store's directory."""
+    return os.path.join(store_path, f"bm25_{collection_name}")
+
+
+def make_retriever(vector_store, store_path: str, collection_name: str, mode: str = RETRIEVAL_MODE):
+    """Retriever for `mode` (vector, lexical or hybrid); without a saved BM25 index this is the vector store."""
+    if mode == "vector":
+        return vector_store
+    lexical = BM25Index.load(index_path(store_path, collection_name))
+    if lexical is None:
+        return vector_store
+    if mode == "lexical":
+        return lexical
+    return HybridRetriever(vector_store, lexical)
@@ -1,17 +1,20 @@
 import os
 from contextlib import contextmanager
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from database import SessionLocal, engine, Base, get_db
+from database import SessionLocal, engine, Base, get_db, DB_ASYNC, describe_engine
 
-import models, schemas, crud
+import models, schemas, crud, migrations, catalog, seats, http_cache, query_router, metrics, startup
+from serializers import JSONBytesResponse
 
-# rag_engine = None
+rag_engine = None
+rag_stream = None
 
 app = FastAPI(
     title="Bus Ticket Booking & RAG API",
@@ -32,7 +35,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Outermost, so the recorded latency includes CORS handling.
+app.add_middleware(metrics.MetricsMiddleware)
 
 @contextmanager
 def get_db_context():
@@ -46,79 +52,171 @@ def get_db_context():
 def startup_event():
     
     Base.metadata.create_all(bind=engine)
+    migrations.upgrade_schema(engine)
     print("SQL Database tables created")
+
+    settings = describe_engine(engine)
+    print("Database engine: " + ", ".join(f"{k}={v}" for k, v in settings.items()))
+    if settings["backend"] == "sqlite" and str(settings.get("journal_mode")).lower() != "wal":
+        print("WARNING: SQLite is not in WAL mode; concurrent bookings will block readers.")
     
+    # Both run in the background; GET /ready reports when they are done.
+    startup.start("ingest", ingest_routes)
+    startup.start("rag", init_rag)
+    print("Startup Complete. API accepting requests.")
+
+
+def ingest_routes():
     with get_db_context() as db:
         try:
-            existing_route = db.query(models.BusRoute).first()
-            if existing_route:
-                print("Bus routes already exist in the database. Skipping ingestion.")
-            else:
-                crud.ingest_routes_from_json(db, json_filepath="../data/data.json")
+            # Incremental: unchanged routes are left alone and keep their ids.
+            crud.ingest_routes_from_json(db, json_filepath="../data/data.json")
         except FileNotFoundError:
             print("ERROR: data/data.json not found...")
         except Exception as e:
+            db.rollback()
             print(f"ERROR during route ingestion: {e}")
 
-    # try:
-    
-    #     global rag_engine
-    #     import rag_engine as _rag
-    #     rag_engine = _rag
+        if catalog.current() is None:
+            # Ingestion did not run; serve whatever routes the database already holds.
+            catalog.rebuild(db)
+
 
-    #     rag_engine.create_vector_store()
-    # except Exception as e:
-    #     print(f"ERROR during RAG vector store setup or import: {e}")
+def init_rag():
+    global rag_engine, rag_stream
+    import rag_engine as _rag
+    import rag_stream as _rag_stream
 
-    #     if "GEMINI_API_KEY" not in os.environ or not os.environ["GEMINI_API_KEY"]:
-    #         print("GEMINI_API_KEY is missing !")
+    # Opens the vector store, answer cache and Gemini client once and runs a warm-up query.
+    rag = _rag.init_engine()
+    rag_engine, rag_stream = _rag, _rag_stream
+    if rag.client is None:
+        print("GEMINI_API_KEY is missing !")
 
-    # print(os.environ.get("GEMINI_API_KEY", "GEMINI_API_KEY not set"))
-    # print("Startup Complete. API Ready.")
+
+if DB_ASYNC:
+    import async_api
+    # Registered before the sync handlers below so it serves the shared paths.
+    app.include_router(async_api.router)
+    print("Serving database endpoints with the async engine.")
 
 
 @app.get("/")
 def check_api():
     return {"message": "Application is running."}
 
-@app.get("/api/all_routes")
-def all_routes(db: Session = Depends(get_db)):
-    routes = db.query(models.BusRoute).all()
-    return routes
 
-@app.get("/api/routes", summary="Search for buses by origin and destination using query parameters")
-def search_buses(request: Request, db: Session = Depends(get_db)):
-    routes = crud.get_buses_by_route(db, request)
-    if not routes:
-        return []
+@app.get("/ready", include_in_schema=False)
+def readiness():
+    """State and duration of each background startup task; 503 until all have finished."""
+    report = startup.report()
+    return JSONBytesResponse(report, status_code=status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def rag_unavailable() -> HTTPException:
+    if startup.state("rag") in (startup.PENDING, startup.RUNNING):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG service is starting; try again shortly (see GET /ready).",
+            headers={"Retry-After": "5"},
+        )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="RAG service is not available. Missing dependencies or initialization failed.",
+    )
 
-    serialized = []
-    for r in routes:
-        try:
-            serialized.append(schemas.BusRoute.from_orm(r))
-        except Exception:
-            serialized.append(schemas.BusRoute.model_validate(r))
 
-    return serialized
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint():
+    """Request and stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/all_routes", summary="Page through the route catalog, or stream it as NDJSON with stream=true",
+         response_class=JSONBytesResponse)
+def all_routes(
+    request: Request,
+    after_id: int = Query(0, ge=0, description="Return routes with id greater than this cursor"),
+    limit: int = Query(500, ge=1, le=5000),
+    origin: Optional[str] = None,
+    provider: Optional[str] = None,
+    stream: bool = False,
+):
+    route_catalog = catalog.current()
+    headers = {}
+    if route_catalog is not None:
+        # Routes only change through ingestion, which also rebuilds the catalog.
+        filters = (models.normalize_key(origin) if origin else None, provider.strip() if provider else None)
+        etag = route_catalog.etag("all_routes", stream, after_id, limit, *filters)
+        cached = http_cache.not_modified(request, etag, route_catalog)
+        if cached is not None:
+            return cached
+        headers = http_cache.cache_headers(etag, route_catalog)
+
+    if stream:
+        # The generator checks out its own connection for as long as the body streams; no session is opened here.
+        return StreamingResponse(
+            crud.stream_routes_ndjson(engine, origin=origin, provider=provider),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+
+    with get_db_context() as db:
+        routes, next_after_id = crud.get_routes_page(db, after_id=after_id, limit=limit, origin=origin, provider=provider)
+    return JSONBytesResponse({"routes": routes, "next_after_id": next_after_id}, headers=headers)
+
+@app.get("/api/routes", summary="Search for buses by origin and destination using query parameters",
+         response_class=JSONBytesResponse, responses={200: {"model": List[schemas.BusRoute]}})
+def search_buses(request: Request):
+    route_catalog = catalog.current()
+    if route_catalog is not None:
+        origin = request.query_params.get("origin")
+        destination = request.query_params.get("destination")
+        if not origin or not destination:
+            raise HTTPException(status_code=400, detail="Please provide both 'origin' and 'destination' query parameters.")
+        return http_cache.cached_json(
+            request,
+            route_catalog.search_json(origin, destination),
+            route_catalog.search_etag(origin, destination),
+            route_catalog,
+        )
+
+    # Catalog not loaded (e.g. ingestion failed at startup): fall back to SQL.
+    with get_db_context() as db:
+        routes = crud.get_buses_by_route(db, request)
+    return JSONBytesResponse(routes)
 
 
 @app.post("/api/book_ticket", response_model=schemas.Booking, status_code=status.HTTP_201_CREATED)
 def book_ticket(booking: schemas.BookingCreate, db: Session = Depends(get_db)):
     
-    route = db.query(models.BusRoute).filter(models.BusRoute.id == booking.route_id).first()
-    if not route:
-        raise HTTPException(status_code=404, detail="Bus route not found.")
+    route = crud.require_live_route(db.query(models.BusRoute).filter(models.BusRoute.id == booking.route_id).first())
         
-    db_booking = crud.create_booking(db=db, booking=booking)
+    db_booking = crud.create_booking(db=db, booking=booking, route=route)
     return db_booking
 
 
-@app.get("/api/bookings/{phone}", response_model=List[schemas.Booking])
-def view_bookings(phone: str, db: Session = Depends(get_db)):
-    bookings = crud.get_bookings_by_phone(db, user_phone=phone)
-    print(bookings)
-    # return [schemas.Booking.model_validate(b) for b in bookings]
-    return bookings
+@app.get("/api/routes/{route_id}/seats", response_model=schemas.SeatAvailability)
+def route_seats(route_id: int, db: Session = Depends(get_db)):
+    route = crud.require_live_route(db.query(models.BusRoute).filter(models.BusRoute.id == route_id).first())
+
+    available = seats.available_seats(db, route)
+    return {"route_id": route_id, "total_seats": route.total_seats, "available_seats": available}
+
+
+@app.get("/api/bookings/{phone}", summary="Page through a phone's bookings, newest first",
+         response_class=JSONBytesResponse, responses={200: {"model": schemas.BookingPage}})
+def view_bookings(
+    phone: str,
+    before_id: Optional[int] = Query(None, ge=1, description="Return bookings older than this one (the previous page's next_before_id)"),
+    limit: int = Query(50, ge=1, le=500),
+    booking_status: Optional[Literal["Booked", "Canceled"]] = Query(None, alias="status"),
+    compact: bool = Query(False, description="Leave out the embedded route"),
+    db: Session = Depends(get_db),
+):
+    bookings, next_before_id = crud.get_bookings_by_phone(
+        db, user_phone=phone, before_id=before_id, limit=limit, status=booking_status, compact=compact
+    )
+    return JSONBytesResponse({"bookings": bookings, "next_before_id": next_before_id})
 
 
 @app.post("/api/cancel_booking/{booking_id}", response_model=schemas.Booking)
@@ -130,22 +228,67 @@ def cancel_booking_endpoint(booking_id: int, db: Session = Depends(get_db)):
     return cancelled_booking
 
 
-# @app.post("/api/query_info")
-# async def query_info(query_data: schemas.RAGQuery):
-    
-#     try:
-#         if rag_engine is None:
-#             raise HTTPException(
-#                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-#                 detail="RAG service is not available. Missing dependencies or initialization failed.",
-#             )
-
-#         response_text = await rag_engine.process_rag_query(query_data.query)
-#         return {"response": response_text}
-#     except Exception as e:
-#         # Catch LLM/API errors gracefully
-#         print(f"RAG Pipeline Error: {e}")
-#         raise HTTPException(
-#             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-#             detail="The RAG service is currently unavailable or encountered an API error. Check backend logs."
-#         )
\ No newline at end of file
+@app.post("/api/route_query", response_model=schemas.RoutedAnswer)
+def route_query(query_data: schemas.RAGQuery, db: Session = Depends(get_db)):
+    """Answer route, fare and coverage questions from SQL; `answer` is null when RAG should handle it."""
+    routed = query_router.route_query(db, query_data.query)
+    return routed.as_dict() if routed is not None else {}
+
+
+@app.get("/api/answer_cache")
+def answer_cache_stats():
+    """Hit/miss counters and generation time saved by the RAG answer cache shared with the chatbot."""
+    if rag_engine is None:
+        raise rag_unavailable()
+
+    # The engine's cache: one open connection, and entries counted for the live corpus version.
+    return rag_engine.get_engine().answer_cache.stats()
+
+
+@app.post("/api/retrieve_batch", response_class=JSONBytesResponse, responses={200: {"model": List[schemas.RetrievalResult]}})
+def retrieve_batch(batch: schemas.BatchRetrievalQuery):
+    """Top-k chunks with scores and metadata for every query; all queries share one embedding call and one search."""
+    if rag_engine is None:
+        raise rag_unavailable()
+    import vector_index
+
+    try:
+        vector_index.check_filter(batch.filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    results = rag_engine.get_engine().retrieve_many(batch.queries, k=batch.k, filter=batch.filter)
+    return JSONBytesResponse([
+        {
+            "query": query,
+            "documents": [
+                {"id": doc.id, "content": doc.page_content, "metadata": doc.metadata, "score": score}
+                for doc, score in hits
+            ],
+        }
+        for query, hits in zip(batch.queries, results)
+    ])
+
+
+@app.post("/api/query_info", summary="Answer a policy question; streams tokens as Server-Sent Events unless stream=false")
+async def query_info(query_data: schemas.RAGQuery, stream: bool = True):
+    if rag_stream is None:
+        raise rag_unavailable()
+
+    if stream:
+        # Errors after the first byte arrive as an `error` event instead of a status code.
+        return StreamingResponse(
+            rag_stream.sse_stream(query_data.query),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    try:
+        return await rag_stream.answer_json(query_data.query)
+    except Exception as e:
+        # Catch LLM/API errors gracefully
+        print(f"RAG Pipeline Error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The RAG service is currently unavailable or encountered an API error. Check backend logs."
+        )
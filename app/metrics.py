@@ -0,0 +1,241 @@
+"""In-process latency histograms, per-request stage spans and sampled profiling.
+
+``MetricsMiddleware`` times every request into ``http_request_duration_seconds``
+(labelled by method, route template and status). Hot paths wrap their work in
+``span(stage)``, which records into ``stage_duration_seconds``. Stages:
+sql, hydrate, serialize, embedding, vector_search, retrieval, prompt and llm.
+SQL statements are timed by engine events (``instrument_engine``). Both
+histograms are served in the Prometheus text format at ``/metrics``.
+
+With ``SERVER_TIMING=1``, or when a request sends ``X-Server-Timing: 1``, the
+response carries a ``Server-Timing`` header that sums the request's spans per
+stage. Spans that finish after the headers are sent, such as those in the body
+of a streaming response, only reach the histograms.
+
+``PROFILE_SAMPLE_RATE`` (0 = off) runs cProfile for that fraction of requests,
+and keeps the capture in ``PROFILE_DIR`` when the request took longer than
+``PROFILE_SLOW_MS``. cProfile only follows the thread that enabled it and sync
+endpoints run in a thread pool, so the profiler is enabled inside each span,
+in whichever thread runs it. A capture therefore covers the instrumented
+stages of the request. Only one span is profiled at a time in the process;
+spans that overlap it, in the same request or another, are timed but not
+profiled.
+"""
+import cProfile
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "../data/profiles")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, seconds: float, *labels: str):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float]]:
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def _labels(self, values: Sequence[str], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency until the last body byte.", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Latency of instrumented hot-path stages.", ("stage",))
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS]
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class RequestTrace:
+    """Span totals of one request and, when sampled, its profiler captures."""
+
+    __slots__ = ("stages", "profiles", "profiling", "_lock")
+
+    def __init__(self, profiling: bool = False):
+        self.stages: Dict[str, List[float]] = {}  # stage -> [seconds, count]
+        self.profiles: List[cProfile.Profile] = []
+        self.profiling = profiling
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            totals = self.stages.get(stage)
+            if totals is None:
+                self.stages[stage] = [seconds, 1]
+            else:
+                totals[0] += seconds
+                totals[1] += 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        with self._lock:
+            parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, (seconds, _) in self.stages.items()]
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# Threads started by asyncio.to_thread / the request thread pool inherit the context, so spans
+# recorded there land in the same trace.
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+# Only one cProfile can be active per process (``sys.monitoring`` on 3.12+), so
+# a span whose request is sampled skips profiling while another span holds it.
+_profiler_lock = threading.Lock()
+
+
+@contextmanager
+def span(stage: str, profile: bool = True):
+    """Time a block into `stage`; pass profile=False for blocks that await (other tasks would show up)."""
+    trace = _trace.get()
+    profiler = None
+    if profile and trace is not None and trace.profiling and _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage, py-spy in-process) is active.
+            profiler = None
+            _profiler_lock.release()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+            with trace._lock:
+                trace.profiles.append(profiler)
+        STAGE_SECONDS.observe(elapsed, stage)
+        if trace is not None:
+            trace.add(stage, elapsed)
+
+
+def observe(stage: str, seconds: float):
+    """Record a duration measured elsewhere (e.g. time to first token) as a stage."""
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def instrument_engine(engine):
+    """Time every SQL statement run on `engine` (or an AsyncEngine's sync engine) as the `sql` stage."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        observe("sql", time.perf_counter() - conn.info["query_start"].pop())
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # Templates, not raw paths, so /api/bookings/{phone} stays one series.
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _save_profile(trace: RequestTrace, scope, seconds: float):
+    stats = pstats.Stats(trace.profiles[0])
+    for profiler in trace.profiles[1:]:
+        stats.add(profiler)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = re.sub(r"[^A-Za-z0-9]+", "_", _route_label(scope)).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{route}_{seconds * 1000:.0f}ms.prof")
+    stats.dump_stats(path)
+    print(f"Slow request {scope['method']} {scope['path']} took {seconds * 1000:.0f} ms; profile saved to {path}")
+
+
+class MetricsMiddleware:
+    """ASGI middleware (not BaseHTTPMiddleware, so streaming bodies pass straight through)."""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 slow_ms: float = PROFILE_SLOW_MS):
+        self.app = app
+        self.server_timing = server_timing
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        trace = RequestTrace(profiling=self.sample_rate > 0 and random.random() < self.sample_rate)
+        token = _trace.set(trace)
+        timing = self.server_timing or (b"x-server-timing", b"1") in scope.get("headers", ())
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timing:
+                    header = trace.server_timing(time.perf_counter() - start).encode()
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace.reset(token)
+            elapsed = time.perf_counter() - start
+            REQUEST_SECONDS.observe(elapsed, scope["method"], _route_label(scope), str(status))
+            if trace.profiles and elapsed >= self.slow_seconds:
+                _save_profile(trace, scope, elapsed)
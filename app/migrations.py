@@ -0,0 +1,151 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import models, ingest
+
+
+def _column_names(engine: Engine, table: str):
+    return {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+LEGACY_ROUTE_COLUMNS = ("provider_name", "origin", "destination", "dropping_point", "origin_key", "destination_key")
+ROUTE_ID_COLUMNS = ("provider_id", "origin_id", "destination_id", "dropping_point_id")
+
+
+def normalize_route_table(engine: Engine):
+    """Convert a bus_routes table that stores names as strings to the integer-key layout.
+
+    Route ids are kept, so existing bookings and seat inventories stay valid.
+    The dimension tables are filled from the distinct names already present.
+    """
+    columns = _column_names(engine, "bus_routes")
+    if "provider_name" not in columns:
+        return False
+
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text("SELECT id, provider_name, origin, destination, dropping_point, fare FROM bus_routes")
+        ).all()
+
+        points, coverage = {}, {}
+        for r in rows:
+            points.setdefault(r.destination, {}).setdefault(r.dropping_point, r.fare)
+            coverage.setdefault(r.provider_name, set()).update((r.origin, r.destination))
+        data = {
+            "districts": [
+                {"name": name, "dropping_points": [{"name": dp, "price": price} for dp, price in dps.items()]}
+                for name, dps in points.items()
+            ],
+            "bus_providers": [
+                {"name": name, "coverage_districts": sorted(districts)} for name, districts in coverage.items()
+            ],
+        }
+        ids = ingest.sync_dimensions(Session(bind=conn), data)
+
+        for name in ROUTE_ID_COLUMNS:
+            if name not in columns:
+                conn.execute(text(f"ALTER TABLE bus_routes ADD COLUMN {name} INTEGER"))
+        if rows:
+            conn.execute(
+                text(
+                    "UPDATE bus_routes SET provider_id = :provider_id, origin_id = :origin_id, "
+                    "destination_id = :destination_id, dropping_point_id = :dropping_point_id WHERE id = :id"
+                ),
+                [
+                    {
+                        "id": r.id,
+                        "provider_id": ids["providers"][r.provider_name],
+                        "origin_id": ids["districts"][r.origin],
+                        "destination_id": ids["districts"][r.destination],
+                        "dropping_point_id": ids["dropping_points"][(ids["districts"][r.destination], r.dropping_point)],
+                    }
+                    for r in rows
+                ],
+            )
+
+        # SQLite refuses to drop indexed columns, so the old indexes go first.
+        for index in inspect(conn).get_indexes("bus_routes"):
+            if set(index["column_names"]) & set(LEGACY_ROUTE_COLUMNS):
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+        for name in LEGACY_ROUTE_COLUMNS:
+            if name in columns:
+                conn.execute(text(f"ALTER TABLE bus_routes DROP COLUMN {name}"))
+    return True
+
+
+# Nullable columns added to existing tables after their first release.
+ADDED_COLUMNS = {"bus_routes": ("retired_at",)}
+
+
+def add_missing_columns(engine: Engine):
+    added = []
+    with engine.begin() as conn:
+        for table_name, names in ADDED_COLUMNS.items():
+            existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+            for name in names:
+                if name not in existing:
+                    column = models.Base.metadata.tables[table_name].c[name]
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"))
+                    added.append(f"{table_name}.{name}")
+    return added
+
+
+def create_missing_indexes(engine: Engine):
+    """Create indexes declared on the models that an older database does not have yet."""
+    created = []
+    for table in models.Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
+
+
+# Indexes that newer ones make redundant: ix_bookings_phone_time starts with user_phone.
+REPLACED_INDEXES = {"bookings": ("ix_bookings_user_phone",)}
+
+
+def drop_replaced_indexes(engine: Engine):
+    dropped = []
+    with engine.begin() as conn:
+        for table, names in REPLACED_INDEXES.items():
+            existing = {ix["name"] for ix in inspect(conn).get_indexes(table)}
+            for name in names:
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                    dropped.append(name)
+    return dropped
+
+
+def normalize_booking_phones(engine: Engine):
+    """Rewrite phone numbers stored before normalization, so old bookings show up in their owner's history."""
+    with engine.begin() as conn:
+        phones = conn.execute(text("SELECT DISTINCT user_phone FROM bookings WHERE user_phone IS NOT NULL")).scalars().all()
+        changes = [{"old": phone, "new": models.normalize_phone(phone)} for phone in phones if models.normalize_phone(phone) != phone]
+        if changes:
+            conn.execute(text("UPDATE bookings SET user_phone = :new WHERE user_phone = :old"), changes)
+    return len(changes)
+
+
+def upgrade_schema(engine: Engine):
+    """Bring an existing database up to the current models.
+
+    `create_all` only creates missing tables, so columns and indexes added to
+    existing tables are applied here. Every step is idempotent.
+    """
+    if normalize_route_table(engine):
+        print("Migrated bus_routes to integer keys over providers/districts/dropping_points.")
+    added = add_missing_columns(engine)
+    if added:
+        print(f"Added columns: {', '.join(added)}")
+    created = create_missing_indexes(engine)
+    if created:
+        print(f"Created indexes: {', '.join(created)}")
+    dropped = drop_replaced_indexes(engine)
+    if dropped:
+        print(f"Dropped indexes: {', '.join(dropped)}")
+    normalized = normalize_booking_phones(engine)
+    if normalized:
+        print(f"Normalized {normalized} booking phone numbers.")
@@ -1,31 +1,159 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index, LargeBinary, UniqueConstraint, func, select
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
+import re
+
+
+def normalize_key(value: str) -> str:
+    """Search key for a place name: trimmed, inner whitespace collapsed, case-folded."""
+    return " ".join(value.split()).casefold()
+
+
+def normalize_phone(value: str) -> str:
+    """Stored form of a phone number: digits only, with the +880 country code written as the national 0."""
+    digits = re.sub(r"\D", "", value or "")
+    if digits.startswith("880") and len(digits) == 13:
+        digits = "0" + digits[3:]
+    return digits
+
+
+class Provider(Base):
+    __tablename__ = "providers"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+
+
+class District(Base):
+    __tablename__ = "districts"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    # normalize_key(name), so searches resolve a typed district name with one lookup.
+    key = Column(String, nullable=False, unique=True)
+
+
+class DroppingPoint(Base):
+    __tablename__ = "dropping_points"
+
+    id = Column(Integer, primary_key=True)
+    district_id = Column(Integer, ForeignKey("districts.id"), nullable=False)
+    name = Column(String, nullable=False)
+    price = Column(Float)
+
+    __table_args__ = (
+        UniqueConstraint("district_id", "name"),
+    )
+
+
+class ProviderCoverage(Base):
+    __tablename__ = "provider_coverage"
+
+    provider_id = Column(Integer, ForeignKey("providers.id"), primary_key=True)
+    district_id = Column(Integer, ForeignKey("districts.id"), primary_key=True)
+
 
 class BusRoute(Base):
+    """One bookable provider x origin x destination x dropping point, stored as integer keys."""
     __tablename__ = "bus_routes"
 
     id = Column(Integer, primary_key=True, index=True)
-    provider_name = Column(String, index=True)
-    origin = Column(String, index=True)
-    destination = Column(String, index=True)
-    dropping_point = Column(String)
+    provider_id = Column(Integer, ForeignKey("providers.id"), nullable=False, index=True)
+    origin_id = Column(Integer, ForeignKey("districts.id"), nullable=False)
+    destination_id = Column(Integer, ForeignKey("districts.id"), nullable=False)
+    dropping_point_id = Column(Integer, ForeignKey("dropping_points.id"), nullable=False)
     departure_time = Column(String, nullable=True)
     fare = Column(Float)
     total_seats = Column(Integer, default=40)
-    
+    # Set by ingest when the route leaves data.json but still has bookings; the
+    # row stays so those bookings resolve, but it is no longer searched or booked.
+    retired_at = Column(DateTime(timezone=True), nullable=True)
+
+    provider = relationship("Provider", lazy="joined")
+    origin_district = relationship("District", foreign_keys=[origin_id], lazy="joined")
+    destination_district = relationship("District", foreign_keys=[destination_id], lazy="joined")
+    dropping_point_ref = relationship("DroppingPoint", lazy="joined")
     bookings = relationship("Booking", back_populates="route")
 
+    __table_args__ = (
+        Index("ix_bus_routes_search", "origin_id", "destination_id"),
+    )
+
+    @property
+    def provider_name(self):
+        return self.provider.name
+
+    @property
+    def origin(self):
+        return self.origin_district.name
+
+    @property
+    def destination(self):
+        return self.destination_district.name
+
+    @property
+    def dropping_point(self):
+        return self.dropping_point_ref.name
+
+
+def route_select(*extra_columns, include_retired: bool = False):
+    """Core select of flattened route rows, named like schemas.BusRoute.
+
+    Retired routes are left out unless `include_retired` (booking history).
+    """
+    origin = District.__table__.alias("origin_district")
+    destination = District.__table__.alias("destination_district")
+    routes = BusRoute.__table__
+    stmt = (
+        select(
+            routes.c.id,
+            Provider.__table__.c.name.label("provider_name"),
+            origin.c.name.label("origin"),
+            destination.c.name.label("destination"),
+            routes.c.departure_time,
+            DroppingPoint.__table__.c.name.label("dropping_point"),
+            routes.c.fare,
+            routes.c.total_seats,
+            *extra_columns,
+        )
+        .select_from(routes)
+        .join(Provider.__table__, Provider.__table__.c.id == routes.c.provider_id)
+        .join(origin, origin.c.id == routes.c.origin_id)
+        .join(destination, destination.c.id == routes.c.destination_id)
+        .join(DroppingPoint.__table__, DroppingPoint.__table__.c.id == routes.c.dropping_point_id)
+        .order_by(routes.c.id)
+    )
+    if not include_retired:
+        stmt = stmt.where(routes.c.retired_at.is_(None))
+    return stmt
+
+
 class Booking(Base):
     __tablename__ = "bookings"
 
     id = Column(Integer, primary_key=True, index=True)
     user_name = Column(String)
-    user_phone = Column(String, index=True)
+    # normalize_phone(), so "+880 1711-000000" and "01711000000" are one history.
+    user_phone = Column(String)
     seat_number = Column(String)
     booking_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     status = Column(String, default="Booked")
     
-    route_id = Column(Integer, ForeignKey("bus_routes.id"))
-    route = relationship("BusRoute", back_populates="bookings")
\ No newline at end of file
+    route_id = Column(Integer, ForeignKey("bus_routes.id"), index=True)
+    route = relationship("BusRoute", back_populates="bookings")
+
+    __table_args__ = (
+        # Booking history pages: one phone, newest first, keyset on (booking_time, id).
+        Index("ix_bookings_phone_time", "user_phone", "booking_time", "id"),
+    )
+
+
+class SeatInventory(Base):
+    """Per-route seat occupancy; bit i of `occupied` is set while seat index i is booked."""
+    __tablename__ = "seat_inventory"
+
+    route_id = Column(Integer, ForeignKey("bus_routes.id"), primary_key=True)
+    occupied = Column(LargeBinary, nullable=False)
+    # Bumped on every change; claims and releases are compare-and-swap on it.
+    version = Column(Integer, nullable=False, default=0)
\ No newline at end of file
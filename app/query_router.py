@@ -0,0 +1,199 @@
+"""Answer route, fare and coverage questions from SQL before falling back to RAG.
+
+Questions such as "Are there any buses from Dhaka to Rajshahi under 500 taka?"
+are matched against the known district and provider names, answered with the
+indexed (origin_id, destination_id) lookup and rendered from a template.
+Anything else, including policy questions that mention a provider, returns
+None and goes to the RAG pipeline.
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models, catalog
+
+# Older spellings that still show up in questions.
+DISTRICT_ALIASES = {
+    "chittagong": "chattogram",
+    "barisal": "barishal",
+    "jessore": "jashore",
+    "comilla": "cumilla",
+    "bogra": "bogura",
+}
+
+# Words that mark an open-ended policy question even when places or providers are named.
+POLICY_WORDS = re.compile(
+    r"\b(polic(?:y|ies)|refund|cancel\w*|contact|phone|hotline|email|luggage|baggage|rules?|complain\w*|lost|pet|child(?:ren)?)\b"
+)
+PROVIDER_LIST_WORDS = re.compile(r"\b(providers?|operators?|compan(?:y|ies)|which bus(?:es)?|who (?:runs|operates))\b")
+COVERAGE_WORDS = re.compile(r"\b(cover(?:s|age)?|districts?|operates? (?:in|to)|goes? to|serves?)\b")
+MAX_FARE = re.compile(r"\b(?:under|below|less than|cheaper than|within|up to|upto|at most|max(?:imum)?|no more than)\s*(?:tk\.?|taka|bdt|৳)?\s*(\d+)")
+MAX_FARE_SUFFIX = re.compile(r"\b(\d+)\s*(?:tk|taka|bdt|৳)?\s*(?:or less|or below|max)\b")
+MIN_FARE = re.compile(r"\b(?:over|above|more than|at least|min(?:imum)?)\s*(?:tk\.?|taka|bdt|৳)?\s*(\d+)")
+MAX_LISTED = 10
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(re.sub(r"[^\w৳\s]", " ", text.casefold()).split())
+
+
+class RoutedAnswer:
+    __slots__ = ("answer", "intent", "params")
+
+    def __init__(self, answer: str, intent: str, params: dict):
+        self.answer = answer
+        self.intent = intent
+        self.params = params
+
+    def as_dict(self) -> dict:
+        return {"answer": self.answer, "intent": self.intent, "params": self.params}
+
+
+class QueryRouter:
+    """Intent matcher over the district/provider vocabulary of one catalog version."""
+
+    def __init__(self, districts: Dict[str, Tuple[int, str]], providers: Dict[str, Tuple[int, str]], version: Optional[int] = None):
+        # normalized name -> (id, display name)
+        self.districts = dict(districts)
+        for alias, key in DISTRICT_ALIASES.items():
+            if key in self.districts and alias not in self.districts:
+                self.districts[alias] = self.districts[key]
+        self.providers = providers
+        self.version = version
+        self._district_pattern = self._names_pattern(self.districts)
+        self._provider_pattern = self._names_pattern(providers)
+
+    @staticmethod
+    def _names_pattern(names) -> Optional[re.Pattern]:
+        if not names:
+            return None
+        # Longest first, so "cox s bazar" wins over a shorter name it contains.
+        alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        return re.compile(rf"\b({alternatives})\b")
+
+    @classmethod
+    def from_db(cls, db: Session, version: Optional[int] = None) -> "QueryRouter":
+        districts = {
+            normalize_query(name): (district_id, name)
+            for district_id, name in db.execute(select(models.District.id, models.District.name))
+        }
+        providers = {
+            normalize_query(name): (provider_id, name)
+            for provider_id, name in db.execute(select(models.Provider.id, models.Provider.name))
+        }
+        return cls(districts, providers, version)
+
+    def _places(self, text: str):
+        """(origin, destination) as (id, name) pairs, using from/to cues before falling back to mention order."""
+        if self._district_pattern is None:
+            return None, None
+        origin = destination = None
+        unassigned = []
+        for match in self._district_pattern.finditer(text):
+            place = self.districts[match.group(1)]
+            before = text[:match.start()].split()[-1:]
+            cue = before[0] if before else ""
+            if cue == "from" and origin is None:
+                origin = place
+            elif cue in ("to", "towards") and destination is None:
+                destination = place
+            elif place not in unassigned:
+                unassigned.append(place)
+        for place in unassigned:
+            if origin is None and place != destination:
+                origin = place
+            elif destination is None and place != origin:
+                destination = place
+        return origin, destination
+
+    def _provider(self, text: str):
+        if self._provider_pattern is None:
+            return None
+        match = self._provider_pattern.search(text)
+        return self.providers[match.group(1)] if match else None
+
+    @staticmethod
+    def _fare_limits(text: str):
+        max_match = MAX_FARE.search(text) or MAX_FARE_SUFFIX.search(text)
+        min_match = MIN_FARE.search(text)
+        return (int(max_match.group(1)) if max_match else None, int(min_match.group(1)) if min_match else None)
+
+    def route(self, db: Session, query: str) -> Optional[RoutedAnswer]:
+        text = normalize_query(query)
+        if not text or POLICY_WORDS.search(text):
+            return None
+
+        origin, destination = self._places(text)
+        provider = self._provider(text)
+        if origin and destination:
+            max_fare, min_fare = self._fare_limits(text)
+            return self._answer_routes(db, text, origin, destination, provider, max_fare, min_fare)
+        if provider and not origin and COVERAGE_WORDS.search(text):
+            return self._answer_coverage(db, provider)
+        return None
+
+    def _answer_routes(self, db: Session, text: str, origin, destination, provider, max_fare, min_fare) -> RoutedAnswer:
+        table = models.BusRoute.__table__
+        stmt = models.route_select().where(table.c.origin_id == origin[0], table.c.destination_id == destination[0])
+        if provider:
+            stmt = stmt.where(table.c.provider_id == provider[0])
+        if max_fare is not None:
+            stmt = stmt.where(table.c.fare <= max_fare)
+        if min_fare is not None:
+            stmt = stmt.where(table.c.fare >= min_fare)
+        rows = db.execute(stmt.order_by(None).order_by(table.c.fare, table.c.id)).all()
+
+        params = {
+            "origin": origin[1], "destination": destination[1],
+            "provider": provider[1] if provider else None, "max_fare": max_fare, "min_fare": min_fare,
+        }
+        conditions = "".join([
+            f" with {provider[1]}" if provider else "",
+            f" under {max_fare} taka" if max_fare is not None else "",
+            f" over {min_fare} taka" if min_fare is not None else "",
+        ])
+        trip = f"from {origin[1]} to {destination[1]}{conditions}"
+
+        if not rows:
+            return RoutedAnswer(f"There are no buses {trip}.", "routes", params)
+
+        if PROVIDER_LIST_WORDS.search(text) and not provider:
+            names = sorted({row.provider_name for row in rows})
+            return RoutedAnswer(f"{len(names)} bus providers operate {trip}: {', '.join(names)}.", "providers", params)
+
+        lines = [f"- {row.provider_name}: {row.dropping_point}, {row.fare:g} taka" for row in rows[:MAX_LISTED]]
+        if len(rows) > MAX_LISTED:
+            lines.append(f"- ...and {len(rows) - MAX_LISTED} more")
+        answer = f"Yes, {len(rows)} buses run {trip}. Cheapest first:\n" + "\n".join(lines)
+        return RoutedAnswer(answer, "routes", params)
+
+    def _answer_coverage(self, db: Session, provider) -> RoutedAnswer:
+        districts = db.execute(
+            select(models.District.name)
+            .join(models.ProviderCoverage, models.ProviderCoverage.district_id == models.District.id)
+            .where(models.ProviderCoverage.provider_id == provider[0])
+            .order_by(models.District.name)
+        ).scalars().all()
+        params = {"provider": provider[1]}
+        if not districts:
+            return RoutedAnswer(f"{provider[1]} has no districts listed.", "coverage", params)
+        return RoutedAnswer(f"{provider[1]} covers {len(districts)} districts: {', '.join(districts)}.", "coverage", params)
+
+
+_router: Optional[QueryRouter] = None
+
+
+def get_router(db: Session) -> QueryRouter:
+    """Router for the current catalog version; rebuilt after re-ingestion changes the catalog."""
+    global _router
+    current = catalog.current()
+    version = current.version if current is not None else None
+    if _router is None or version is None or _router.version != version:
+        _router = QueryRouter.from_db(db, version)
+    return _router
+
+
+def route_query(db: Session, query: str) -> Optional[RoutedAnswer]:
+    return get_router(db).route(db, query)
@@ -1,33 +1,55 @@
+import asyncio
 import os
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from google import genai
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from langchain_core.documents import Document
+
+import answer_cache
+import embeddings
+import lexical_index
+import metrics
+import vector_index
+
+# google.genai, Chroma and the langchain runnables are imported where they are first used;
+# together they take seconds to import and the API should not pay that before serving.
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+LLM_MODEL = 'gemini-2.5-flash'
+
 CHROMA_DB_PATH = "../data/bus_db" 
-COLLECTION_NAME = "bus_infomation"
+COLLECTION_NAME = embeddings.collection_name("bus_infomation")
+
+
+def get_embedding_function():
+    return embeddings.get_embedding_function()
+
+
+_client = None
 
 
 def check_gemini_key():
-    if GEMINI_API_KEY:
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        LLM_MODEL = 'gemini-2.5-flash'
-        return client, LLM_MODEL
-    else:
+    """(client, model), or None without an API key. The client and its HTTP connections are reused."""
+    global _client
+    if not GEMINI_API_KEY:
         return
+    if _client is None:
+        from google import genai
+
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client, LLM_MODEL
 
-def get_chroma_client_and_collection(path: str, collection_name: str):
+def get_chroma_client_and_collection(path: str, collection_name: str, embedding_function=None):
     try:
-        embedding_function = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+        from langchain_community.vectorstores import Chroma
+
+        embedding_function = embedding_function or get_embedding_function()
         
         collection = Chroma(
             collection_name,
@@ -42,72 +64,190 @@ def get_chroma_client_and_collection(path: str, collection_name: str):
         return None
 
 
-def get_rag_answer(user_query: str, collection) -> str:
-    
-    results = collection.similarity_search(
-        user_query,
-    )
-    
-    results = [doc.page_content for doc in results]
-    retrieved_context = " ".join(results)
-    
-    prompt = f"""
+def vector_store_path(collection_name: str = COLLECTION_NAME) -> str:
+    if vector_index.VECTOR_STORE == "numpy":
+        return os.path.join(vector_index.INDEX_PATH, collection_name)
+    return CHROMA_DB_PATH
+
+
+def get_vector_store(collection_name: str = COLLECTION_NAME, embedding_function=None):
+    """Chroma collection, or the in-process NumPy index when VECTOR_STORE=numpy."""
+    embedding_function = embedding_function or get_embedding_function()
+    if vector_index.VECTOR_STORE == "numpy":
+        return vector_index.NumpyVectorIndex(vector_store_path(collection_name), embedding_function)
+    return get_chroma_client_and_collection(CHROMA_DB_PATH, collection_name, embedding_function)
+
+
+RAG_PROMPT = """
     You are an expert bus ticket service assistant. Use ONLY the following retrieved context
     to answer the user's question about bus provider policies, contact details, or specific
     rules. If the information is not found in the context, politely state that you cannot
     answer based on the available provider data.
-    
-    CONTEXT: {retrieved_context}
-    
-    QUESTION: {user_query}
-    
+
+    CONTEXT: {context}
+
+    QUESTION: {question}
+
     ANSWER:
     """
-    
-    try:
-        client, LLM_MODEL = check_gemini_key()
-        response = client.models.generate_content(
-            model=LLM_MODEL,
-            contents=prompt
+
+RAG_WARMUP_QUERY = os.getenv("RAG_WARMUP_QUERY", "What is the cancellation policy?")
+# Also send the warm-up prompt to Gemini, so the first user request finds an open connection (billed).
+RAG_WARMUP_LLM = os.getenv("RAG_WARMUP_LLM", "false").lower() in ("1", "true", "yes")
+
+
+def format_context(documents) -> str:
+    return " ".join(doc.page_content for doc in documents)
+
+
+class RagEngine:
+    """Embedding function, vector store, retriever, answer cache, LLM client and prompt, opened once.
+
+    Pass `retriever` to reuse a store the caller already opened (the Streamlit
+    chatbot does); otherwise the configured store for `collection_name` is loaded.
+    `embedding_function` and `client` default to the configured backend and the
+    Gemini client; benchmarks pass local fakes.
+    """
+
+    def __init__(self, collection_name: str = COLLECTION_NAME, model: str = LLM_MODEL, retriever=None,
+                 embedding_function=None, client=None):
+        self.collection_name = collection_name
+        self.model = model
+        self.timings = {}
+        with self._timed("embeddings"):
+            self.embedding_function = embedding_function or get_embedding_function()
+        with self._timed("vector_store"):
+            if retriever is None:
+                vector_store = get_vector_store(collection_name, self.embedding_function)
+                if vector_store is None:
+                    raise RuntimeError(f"Vector store for collection '{collection_name}' could not be opened.")
+                retriever = lexical_index.make_retriever(vector_store, vector_store_path(collection_name), collection_name)
+            self.retriever = retriever
+        with self._timed("answer_cache"):
+            self.answer_cache = answer_cache.AnswerCache(corpus_version=answer_cache.corpus_version(retriever))
+        if client is None:
+            checked = check_gemini_key()
+            client = checked[0] if checked else None
+        self.client = client
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+        self.prompt = PromptTemplate.from_template(RAG_PROMPT)
+        self.chain = (
+            {"context": RunnableLambda(self.retrieve) | format_context, "question": RunnablePassthrough()}
+            | self.prompt
+            | RunnableLambda(lambda prompt: self.generate(prompt.to_string()))
         )
-        return response.text
+
+    @contextmanager
+    def _timed(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def retrieve(self, user_query: str, k: int = 4):
+        with metrics.span("retrieval"):
+            return self.retriever.similarity_search(user_query, k=k)
+
+    def retrieve_many(self, queries: List[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Tuple["Document", float]]]:
+        """Top-k (Document, score) per query, with all queries embedded and searched as one batch."""
+        with metrics.span("retrieval"):
+            return vector_index.batch_search_with_score(self.retriever, queries, k=k, filter=filter)
+
+    def build_prompt(self, user_query: str, documents) -> str:
+        with metrics.span("prompt"):
+            return self.prompt.format(context=format_context(documents), question=user_query)
+
+    def _require_client(self):
+        if self.client is None:
+            raise RuntimeError("GEMINI_API_KEY is not set.")
+        return self.client
+
+    def generate(self, prompt: str) -> str:
+        with metrics.span("llm"):
+            return self._require_client().models.generate_content(model=self.model, contents=prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self._require_client().models.generate_content_stream(model=self.model, contents=prompt):
+            if chunk.text:
+                yield chunk.text
+
+    def embed_query(self, user_query: str):
+        return self.embedding_function.embed_query(user_query)
+
+    def answer(self, user_query: str) -> str:
+        # Repeated and near-duplicate questions skip retrieval and generation entirely.
+        return self.answer_cache.get_or_generate(
+            user_query,
+            lambda: self.generate(self.build_prompt(user_query, self.retrieve(user_query))),
+            embed=lambda: self.embed_query(user_query),
+            model=self.model,
+        )
+
+    def warm_up(self, user_query: str = RAG_WARMUP_QUERY):
+        """Pay first-query costs now: embedding model/API, index pages, BM25 arrays and the prompt path."""
+        with self._timed("warm_up"):
+            prompt = self.build_prompt(user_query, self.retrieve(user_query))
+            if RAG_WARMUP_LLM and self.client is not None:
+                self.generate(prompt)
+
+    def describe(self) -> str:
+        parts = ", ".join(f"{name} {ms:g} ms" for name, ms in self.timings.items())
+        llm = self.model if self.client is not None else "no LLM client (GEMINI_API_KEY missing)"
+        return f"collection={self.collection_name}, retriever={type(self.retriever).__name__}, llm={llm}; {parts}"
+
+
+_engine: Optional[RagEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RagEngine:
+    """The process-wide engine, built on first use if startup did not build it."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RagEngine()
+    return _engine
+
+
+def init_engine(warm_up: bool = True) -> RagEngine:
+    start = time.perf_counter()
+    engine = get_engine()
+    if warm_up:
+        engine.warm_up()
+    print(f"RAG engine ready in {(time.perf_counter() - start) * 1000:.0f} ms ({engine.describe()})")
+    return engine
+
+
+def get_retriever():
+    return get_engine().retriever
+
+
+def build_prompt(user_query: str, documents) -> str:
+    return get_engine().build_prompt(user_query, documents)
+
+
+def get_rag_answer(user_query: str) -> str:
+    try:
+        return get_engine().answer(user_query)
     except Exception as e:
         return f"An error occurred during generation: {e}"
 
-def get_rag_chain():
-    """Defines the RAG execution chain using LangChain."""
-    
-    vectorstore = get_vector_store()
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-    
-    # Define the template for the LLM
-    template = """
-    You are an expert bus ticket service assistant. Use ONLY the following retrieved context
-    to answer the user's question about bus provider policies, contact details, or specific
-    rules. If the information is not found in the context, politely state that you cannot
-    answer based on the available provider data.
+def answer_query(user_query: str, db) -> str:
+    """SQL-backed answer for route/fare/coverage questions, RAG for everything else."""
+    import query_router
 
-    CONTEXT:
-    {context}
+    routed = query_router.route_query(db, user_query)
+    if routed is not None:
+        return routed.answer
+    return get_rag_answer(user_query)
 
-    USER QUESTION: {question}
-    """
-    prompt = ChatPromptTemplate.from_template(template)
-    
-    
-    rag_chain = (
-        {"context": retriever, "question": RunnablePassthrough()} 
-        | prompt
-        | LLM_MODEL
-        | str 
-    )
-    return rag_chain
+
+def get_rag_chain():
+    """LangChain runnable (retrieve -> prompt -> Gemini) built once with the engine."""
+    return get_engine().chain
 
 async def process_rag_query(query: str) -> str:
-    """Execute the RAG pipeline for a given user query."""
-    if LLM is None or EMBEDDING_MODEL is None:
-        return "RAG engine is unavailable. Check API key and dependencies."
-    
-    
-    rag_chain = get_rag_chain()
-    return rag_chain.invoke(query)
\ No newline at end of file
+    """Execute the RAG pipeline for a given user query in a worker thread."""
+    return await asyncio.to_thread(get_rag_answer, query)
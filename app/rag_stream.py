@@ -0,0 +1,250 @@
+"""Async, streaming RAG answers for /api/query_info.
+
+The question is first offered to the SQL query router and the answer cache.
+Otherwise retrieval runs in a worker thread and the LLM's token stream is
+pumped from a thread into the event loop, so neither blocks other requests.
+At most RAG_MAX_CONCURRENCY LLM calls are in flight. Identical questions that
+arrive while one is being answered share that single upstream call and all
+receive the same token stream.
+
+Set RAG_LLM=fake to use FakeLLM (fixed latency, no network) instead of the
+engine's Gemini stream.
+"""
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+import answer_cache
+import metrics
+import rag_engine
+import serializers
+
+RAG_LLM = os.getenv("RAG_LLM", "gemini").lower()
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "4"))
+FAKE_LLM_FIRST_TOKEN_MS = float(os.getenv("FAKE_LLM_FIRST_TOKEN_MS", "400"))
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "15"))
+
+
+class FakeLLM:
+    """Blocking stand-in for RagEngine.stream: a pause, then one word every `token_ms`."""
+
+    model = "fake-llm"
+
+    def __init__(self, first_token_ms: float = FAKE_LLM_FIRST_TOKEN_MS, token_ms: float = FAKE_LLM_TOKEN_MS, answer: Optional[str] = None):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.answer = answer
+        self.calls = 0
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        self.calls += 1
+        question = prompt.rsplit("QUESTION:", 1)[-1].split("ANSWER:", 1)[0].strip()
+        text = self.answer or f"Based on the provider data, here is what I found about: {question}"
+        time.sleep(self.first_token_ms / 1000)
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                time.sleep(self.token_ms / 1000)
+            yield word if i == 0 else " " + word
+
+
+def make_llm():
+    """Anything with `.model` and a blocking `.stream(prompt)`; the engine streams from Gemini."""
+    if RAG_LLM == "fake":
+        return FakeLLM()
+    return rag_engine.get_engine()
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+    """Drive a blocking iterator in a worker thread and yield its items on the event loop."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def pump():
+        try:
+            for item in make_iterator():
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    worker = loop.run_in_executor(None, pump)
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    await worker
+
+
+class _Flight:
+    """One upstream answer being produced, replayable by any number of followers."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+    async def follow(self) -> AsyncIterator[str]:
+        sent = 0
+        while True:
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.done or len(self.chunks) > sent)
+
+
+class Coalescer:
+    """Shares one producer among concurrent requests with the same key."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def subscribe(self, key: str, produce: Callable[[], AsyncIterator[str]]) -> Tuple[AsyncIterator[str], bool]:
+        """(token stream, joined an existing flight)."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight.follow(), True
+
+        flight = self._flights[key] = _Flight()
+        self.started += 1
+        # A task, not the first caller, drives the upstream call, so followers
+        # keep receiving tokens if that caller disconnects.
+        asyncio.get_running_loop().create_task(self._run(key, flight, produce))
+        return flight.follow(), False
+
+    async def _run(self, key: str, flight: _Flight, produce: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in produce():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            self._flights.pop(key, None)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+
+_llm = None
+_semaphore: Optional[asyncio.Semaphore] = None
+coalescer = Coalescer()
+
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        _llm = make_llm()
+    return _llm
+
+
+def _limit() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(RAG_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _route(query: str):
+    import database, query_router
+
+    db = database.SessionLocal()
+    try:
+        return query_router.route_query(db, query)
+    finally:
+        db.close()
+
+
+async def _generate(query: str, engine: rag_engine.RagEngine) -> AsyncIterator[str]:
+    documents = await asyncio.to_thread(engine.retrieve, query)
+    prompt = engine.build_prompt(query, documents)
+    llm = get_llm()
+    started = time.perf_counter()
+    chunks = []
+    async with _limit():
+        # Spans across awaits are timed but not profiled.
+        with metrics.span("llm", profile=False):
+            async for chunk in iterate_in_thread(lambda: llm.stream(prompt)):
+                if not chunks:
+                    metrics.observe("llm_first_token", time.perf_counter() - started)
+                chunks.append(chunk)
+                yield chunk
+    embedding = await asyncio.to_thread(engine.embed_query, query)
+    await asyncio.to_thread(engine.answer_cache.put, query, "".join(chunks), embedding, time.perf_counter() - started, llm.model)
+
+
+async def answer_events(query: str) -> AsyncIterator[Tuple[str, dict]]:
+    """(event, data) pairs: "token" events with text, then one "done" (or "error") with timings."""
+    started = time.perf_counter()
+    first_token = None
+    source = "rag"
+    coalesced = False
+    try:
+        routed = await asyncio.to_thread(_route, query)
+        if routed is not None:
+            source, tokens = "sql", _single(routed.answer)
+        else:
+            engine = await asyncio.to_thread(rag_engine.get_engine)
+            cached = await asyncio.to_thread(engine.answer_cache.get, query, lambda: engine.embed_query(query))
+            if cached is not None:
+                source, tokens = "cache", _single(cached)
+            else:
+                key = answer_cache.normalize_query(query)
+                tokens, coalesced = coalescer.subscribe(key, lambda: _generate(query, engine))
+
+        async for text in tokens:
+            if first_token is None:
+                first_token = time.perf_counter()
+            yield "token", {"text": text}
+    except Exception as e:
+        yield "error", {"detail": f"An error occurred during generation: {e}"}
+        return
+
+    yield "done", {
+        "source": source,
+        "coalesced": coalesced,
+        "ttft_ms": round((first_token - started) * 1000, 1) if first_token else None,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + serializers.dumps(data) + b"\n\n"
+
+
+async def sse_stream(query: str) -> AsyncIterator[bytes]:
+    async for event, data in answer_events(query):
+        yield sse(event, data)
+
+
+async def answer_json(query: str) -> dict:
+    """Whole answer plus the "done" timings, for clients that do not read SSE."""
+    parts = []
+    async for event, data in answer_events(query):
+        if event == "token":
+            parts.append(data["text"])
+        elif event == "error":
+            raise RuntimeError(data["detail"])
+        else:
+            return {"response": "".join(parts), **data}
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 class BusRouteBase(BaseModel):
@@ -28,9 +28,11 @@ class BookingCreate(BaseModel):
 class Booking(BaseModel):
     id: int
     route_id: int
-    route: Optional[BusRoute]
+    # Left out of compact booking pages.
+    route: Optional[BusRoute] = None
     user_name: str
     user_phone: str
+    seat_number: Optional[str] = None
     booking_time: datetime
     status: str
     
@@ -38,5 +40,35 @@ class Booking(BaseModel):
         from_attributes = True
         # orm_mode = True
 
+class BookingPage(BaseModel):
+    bookings: List[Booking]
+    # Pass as before_id to get the next (older) page; null on the last page.
+    next_before_id: Optional[int]
+
+class SeatAvailability(BaseModel):
+    route_id: int
+    total_seats: int
+    available_seats: List[str]
+
 class RAGQuery(BaseModel):
-    query: str
\ No newline at end of file
+    query: str
+
+class BatchRetrievalQuery(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=1000)
+    k: int = Field(4, ge=1, le=50)
+    filter: Optional[Dict[str, Any]] = None
+
+class RetrievedChunk(BaseModel):
+    id: Optional[str] = None
+    content: str
+    metadata: Dict[str, Any]
+    score: float
+
+class RetrievalResult(BaseModel):
+    query: str
+    documents: List[RetrievedChunk]
+
+class RoutedAnswer(BaseModel):
+    answer: Optional[str] = None
+    intent: Optional[str] = None
+    params: Dict[str, Any] = {}
@@ -0,0 +1,163 @@
+import re
+from typing import List
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import models
+
+SEAT_LETTERS = "ABCD"
+MAX_CLAIM_ATTEMPTS = 25
+
+_SEAT_PATTERN = re.compile(r"^(?:(?P<row>\d+)\s*(?P<col>[A-Z])|(?P<col2>[A-Z])\s*(?P<row2>\d+)|(?P<number>\d+))$")
+
+
+def seat_index(label: str, total_seats: int) -> int:
+    """Zero-based seat index for labels like "5A", "A5" or "17"; raises ValueError if invalid."""
+    match = _SEAT_PATTERN.match(label.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid seat number '{label}'. Use a row and a letter, e.g. 5A.")
+
+    if match["number"]:
+        index = int(match["number"]) - 1
+    else:
+        row = int(match["row"] or match["row2"])
+        col = SEAT_LETTERS.find(match["col"] or match["col2"])
+        if row < 1 or col < 0:
+            raise ValueError(f"Invalid seat number '{label}'. Seat letters are {', '.join(SEAT_LETTERS)}.")
+        index = (row - 1) * len(SEAT_LETTERS) + col
+
+    if not 0 <= index < total_seats:
+        raise ValueError(f"Seat '{label}' does not exist on this bus ({total_seats} seats).")
+    return index
+
+
+def seat_label(index: int) -> str:
+    row, col = divmod(index, len(SEAT_LETTERS))
+    return f"{row + 1}{SEAT_LETTERS[col]}"
+
+
+def _is_set(bitmap: bytes, index: int) -> bool:
+    byte = index >> 3
+    return byte < len(bitmap) and bool(bitmap[byte] & (1 << (index & 7)))
+
+
+def _with_bit(bitmap: bytes, index: int, value: bool) -> bytes:
+    data = bytearray(bitmap)
+    if len(data) <= index >> 3:
+        data.extend(b"\x00" * ((index >> 3) + 1 - len(data)))
+    if value:
+        data[index >> 3] |= 1 << (index & 7)
+    else:
+        data[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+    return bytes(data)
+
+
+def _insert_ignore(db: Session, values: dict):
+    """INSERT that silently loses the race if another request created the row first."""
+    table = models.SeatInventory.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Seat inventory does not support the {dialect} dialect.")
+    db.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=["route_id"]))
+
+
+def _bitmap_from_bookings(db: Session, route: models.BusRoute) -> bytes:
+    """Occupancy rebuilt from the route's live bookings, for routes without an inventory row yet."""
+    total_seats = route.total_seats or 40
+    bitmap = bytes((total_seats + 7) // 8)
+    booked = db.execute(
+        select(models.Booking.seat_number).where(
+            models.Booking.route_id == route.id, models.Booking.status == "Booked"
+        )
+    ).scalars()
+    for label in booked:
+        try:
+            bitmap = _with_bit(bitmap, seat_index(label or "", total_seats), True)
+        except ValueError:
+            continue
+    return bitmap
+
+
+def _inventory_select(route_id: int):
+    table = models.SeatInventory.__table__
+    return select(table.c.occupied, table.c.version).where(table.c.route_id == route_id)
+
+
+def _load_inventory(db: Session, route: models.BusRoute):
+    """(occupied, version) for a route, creating the bitmap from existing bookings on first use."""
+    row = db.execute(_inventory_select(route.id)).first()
+    if row is not None:
+        return row
+
+    _insert_ignore(db, {"route_id": route.id, "occupied": _bitmap_from_bookings(db, route), "version": 0})
+    return db.execute(_inventory_select(route.id)).first()
+
+
+def _compare_and_swap(db: Session, route_id: int, version: int, bitmap: bytes) -> bool:
+    table = models.SeatInventory.__table__
+    result = db.execute(
+        update(table)
+        .where(table.c.route_id == route_id, table.c.version == version)
+        .values(occupied=bitmap, version=version + 1)
+    )
+    return result.rowcount == 1
+
+
+def claim_seat(db: Session, route: models.BusRoute, label: str) -> str:
+    """Atomically mark a seat as taken and return its canonical label.
+
+    Runs inside the caller's transaction, so the claim is rolled back together
+    with the booking if that fails to commit.
+    """
+    try:
+        index = seat_index(label, route.total_seats or 40)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    for _ in range(MAX_CLAIM_ATTEMPTS):
+        occupied, version = _load_inventory(db, route)
+        if _is_set(occupied, index):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Seat {seat_label(index)} is already booked on this route.",
+            )
+        if _compare_and_swap(db, route.id, version, _with_bit(occupied, index, True)):
+            return seat_label(index)
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="This route is busy right now, please try booking again.",
+    )
+
+
+def release_seat(db: Session, route: models.BusRoute, label: str):
+    """Clear a seat's bit; no-op for labels that never mapped to a seat."""
+    try:
+        index = seat_index(label or "", route.total_seats or 40)
+    except ValueError:
+        return
+
+    for _ in range(MAX_CLAIM_ATTEMPTS):
+        occupied, version = _load_inventory(db, route)
+        if not _is_set(occupied, index):
+            return
+        if _compare_and_swap(db, route.id, version, _with_bit(occupied, index, False)):
+            return
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="This route is busy right now, please try cancelling again.",
+    )
+
+
+def available_seats(db: Session, route: models.BusRoute) -> List[str]:
+    # Read-only: without an inventory row the bitmap is built in memory. Only claims and
+    # releases create the row, so seat lookups never take the database write lock.
+    row = db.execute(_inventory_select(route.id)).first()
+    occupied = row[0] if row is not None else _bitmap_from_bookings(db, route)
+    return [seat_label(i) for i in range(route.total_seats or 40) if not _is_set(occupied, i)]
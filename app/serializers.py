@@ -0,0 +1,45 @@
+"""JSON encoding for trusted rows read straight from the database.
+
+Endpoints that return many rows build plain tuples/dicts and encode them
+here, skipping per-row Pydantic validation and FastAPI's jsonable_encoder.
+"""
+import json
+from datetime import date, datetime
+from typing import Iterable, Sequence
+
+from fastapi.responses import Response
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable[Sequence]) -> list:
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose body is either pre-encoded bytes or encoded with `dumps`."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        with metrics.span("serialize"):
+            return dumps(content)
@@ -0,0 +1,91 @@
+"""Startup work that runs after the server starts accepting requests.
+
+Route ingestion and the RAG engine (vector store, retriever, answer cache,
+Gemini client, warm-up query) each take from seconds to minutes on a cold
+start. They run as named background tasks, so the server does not wait for
+them. Endpoints that depend on a task check ``state(name)``, and GET /ready
+reports every task. Set ``STARTUP_BLOCKING=1`` to run the tasks one after
+another inside the startup hook, as before.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+STARTUP_BLOCKING = os.getenv("STARTUP_BLOCKING", "0").lower() in ("1", "true", "yes")
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class StartupTask:
+    __slots__ = ("name", "fn", "state", "error", "started", "finished", "_done")
+
+    def __init__(self, name: str, fn: Callable[[], None]):
+        self.name = name
+        self.fn = fn
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._done = threading.Event()
+
+    def run(self):
+        self.state, self.started = RUNNING, time.perf_counter()
+        try:
+            self.fn()
+            self.state = DONE
+        except Exception as e:
+            self.state, self.error = FAILED, str(e)
+            print(f"ERROR in startup task '{self.name}': {e}")
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+            print(f"Startup task '{self.name}' {self.state} in {(self.finished - self.started) * 1000:.0f} ms")
+
+    def as_dict(self) -> dict:
+        end = self.finished or time.perf_counter()
+        return {
+            "state": self.state,
+            "seconds": round(end - self.started, 3) if self.started is not None else None,
+            "error": self.error,
+        }
+
+
+_tasks: Dict[str, StartupTask] = {}
+_lock = threading.Lock()
+
+
+def start(name: str, fn: Callable[[], None], blocking: bool = STARTUP_BLOCKING) -> StartupTask:
+    """Run `fn` as startup task `name`, in a daemon thread unless `blocking`."""
+    task = StartupTask(name, fn)
+    with _lock:
+        _tasks[name] = task
+    if blocking:
+        task.run()
+    else:
+        threading.Thread(target=task.run, name=f"startup-{name}", daemon=True).start()
+    return task
+
+
+def state(name: str) -> Optional[str]:
+    task = _tasks.get(name)
+    return task.state if task is not None else None
+
+
+def report() -> dict:
+    """Per-task state; ready once every task has finished. A failed task counts, since the app serves what it can without it."""
+    with _lock:
+        tasks = {name: task.as_dict() for name, task in _tasks.items()}
+    return {"ready": all(t["state"] in (DONE, FAILED) for t in tasks.values()), "tasks": tasks}
+
+
+def wait(timeout: Optional[float] = None) -> bool:
+    """Block until every task has finished (benchmarks and scripts that drive the app in-process)."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _lock:
+        tasks = list(_tasks.values())
+    for task in tasks:
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not task._done.wait(remaining):
+            return False
+    return True
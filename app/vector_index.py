@@ -0,0 +1,296 @@
+"""Flat in-process vector index, a lightweight alternative to Chroma.
+
+Normalized embeddings are kept in one contiguous float32 matrix saved as
+``vectors.npy`` and opened memory-mapped; ids, texts and metadata live next to
+it in ``documents.json``. A search is one matrix-vector product followed by
+``argpartition``, which is exact and fast for corpora of this size.
+
+The class implements the parts of the LangChain vector store interface the app
+uses (``similarity_search``, ``get``, ``add_documents``, ``delete``), so it can
+replace Chroma in ``rag_engine.RagEngine`` and ``vector_ingest.sync_vector_store``.
+Select it with ``VECTOR_STORE=numpy``.
+"""
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+import embeddings
+import metrics
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma").lower()
+INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "../data/bus_index")
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores along the last axis, best first."""
+    if k < scores.shape[-1]:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape[:-1] + (scores.shape[-1],))
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+FILTER_OPERATORS = ("$eq", "$in")
+
+
+def filter_values(value) -> list:
+    """Values one metadata field may take: a plain value, ``{"$eq": v}`` or ``{"$in": [...]}``.
+
+    Raises ValueError for any other operator, which neither this index nor the
+    BM25 index can evaluate.
+    """
+    if isinstance(value, dict):
+        if len(value) != 1 or next(iter(value)) not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter {value!r}; use a value, {', '.join(FILTER_OPERATORS)} or $and.")
+        operator, operand = next(iter(value.items()))
+        if operator == "$in" and not isinstance(operand, list):
+            raise ValueError(f"$in takes a list of values, got {operand!r}.")
+        values = operand if operator == "$in" else [operand]
+    else:
+        values = [value]
+    for v in values:
+        if not isinstance(v, (str, int, float, bool)):
+            raise ValueError(f"Filter values must be strings, numbers or booleans, got {v!r}.")
+    return values
+
+
+def check_filter(filter: Optional[dict]):
+    """Raise ValueError unless `filter` only uses field equality, ``$eq``, ``$in`` and ``$and``."""
+    for field, value in (filter or {}).items():
+        if field == "$and":
+            if not isinstance(value, list) or not value or not all(isinstance(clause, dict) for clause in value):
+                raise ValueError("$and takes a non-empty list of filters.")
+            for clause in value:
+                check_filter(clause)
+        elif field.startswith("$"):
+            raise ValueError(f"Unsupported filter operator {field!r}; use field equality, {', '.join(FILTER_OPERATORS)} or $and.")
+        else:
+            filter_values(value)
+
+
+class NumpyVectorIndex:
+    def __init__(self, path: str, embedding_function):
+        self.path = path
+        self.embeddings = embedding_function
+        self._lock = threading.Lock()
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        # field -> value -> row numbers, built on first filtered search.
+        self._field_rows: Dict[str, Dict[object, np.ndarray]] = {}
+        self._pending = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self):
+        documents_path = os.path.join(self.path, DOCUMENTS_FILE)
+        if not os.path.exists(documents_path):
+            return
+        with open(documents_path, "r") as f:
+            documents = json.load(f)
+        self.ids, self.texts, self.metadatas = documents["ids"], documents["texts"], documents["metadatas"]
+        self.vectors = np.load(os.path.join(self.path, VECTORS_FILE), mmap_mode="r")
+        self._field_rows = {}
+
+    def _save(self, ids, texts, metadatas, vectors: np.ndarray):
+        vectors_tmp = os.path.join(self.path, VECTORS_FILE + ".tmp")
+        documents_tmp = os.path.join(self.path, DOCUMENTS_FILE + ".tmp")
+        with open(vectors_tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(documents_tmp, "w") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f, ensure_ascii=False)
+        os.replace(vectors_tmp, os.path.join(self.path, VECTORS_FILE))
+        os.replace(documents_tmp, os.path.join(self.path, DOCUMENTS_FILE))
+        self._load()
+
+    # -- writes ------------------------------------------------------------
+
+    def _apply(self, added, deleted: set):
+        """Rewrite the index once with `added` [(ids, documents, vectors)] upserted and `deleted` ids removed."""
+        with self._lock:
+            replaced = set(deleted)
+            for ids, _, _ in added:
+                replaced.update(ids)
+            keep = [i for i, key in enumerate(self.ids) if key not in replaced]
+            if len(keep) == len(self.ids) and not added:
+                return
+            dim = self.vectors.shape[1] if self.vectors.size else (added[0][2].shape[1] if added else 0)
+            blocks = [np.asarray(self.vectors[keep]) if keep else np.zeros((0, dim), dtype=np.float32)]
+            ids = [self.ids[i] for i in keep]
+            texts = [self.texts[i] for i in keep]
+            metadatas = [self.metadatas[i] for i in keep]
+            for batch_ids, documents, vectors in added:
+                blocks.append(vectors)
+                ids.extend(batch_ids)
+                texts.extend(d.page_content for d in documents)
+                metadatas.extend(dict(d.metadata) for d in documents)
+            self._save(ids, texts, metadatas, np.concatenate(blocks))
+
+    @contextmanager
+    def deferred_writes(self):
+        """Collect add/delete calls and rewrite the files once on exit (used by bulk syncs)."""
+        self._pending = ([], set())
+        try:
+            yield self
+            added, deleted = self._pending
+            self._pending = None
+            self._apply(added, deleted)
+        finally:
+            self._pending = None
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> List[str]:
+        """Upsert `documents`; existing ids are replaced."""
+        if not documents:
+            return []
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in documents]
+        vectors = _normalize(np.asarray(self.embeddings.embed_documents([d.page_content for d in documents]), dtype=np.float32))
+        if self._pending is not None:
+            self._pending[0].append((ids, documents, vectors))
+        else:
+            self._apply([(ids, documents, vectors)], set())
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None):
+        if not ids:
+            return
+        if self._pending is not None:
+            self._pending[1].update(ids)
+        else:
+            self._apply([], set(ids))
+
+    def get(self, include: Optional[List[str]] = None) -> dict:
+        include = include if include is not None else ["documents", "metadatas"]
+        result = {"ids": list(self.ids)}
+        if "documents" in include:
+            result["documents"] = list(self.texts)
+        if "metadatas" in include:
+            result["metadatas"] = list(self.metadatas)
+        return result
+
+    # -- search ------------------------------------------------------------
+
+    def _rows_for(self, field: str, value) -> np.ndarray:
+        by_value = self._field_rows.get(field)
+        if by_value is None:
+            grouped: Dict[object, List[int]] = {}
+            for row, metadata in enumerate(self.metadatas):
+                if field in metadata:
+                    grouped.setdefault(metadata[field], []).append(row)
+            by_value = self._field_rows[field] = {v: np.asarray(rows, dtype=np.int64) for v, rows in grouped.items()}
+        parts = [by_value[v] for v in filter_values(value) if v in by_value]
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def _candidate_rows(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        """Row numbers matching every field of `filter` (equality, ``$eq``, ``$in`` or ``$and``), or None for no filter."""
+        if not filter:
+            return None
+        rows = None
+        for field, value in filter.items():
+            if field == "$and":
+                clauses = [self._candidate_rows(clause) for clause in value]
+                matched = clauses[0]
+                for clause in clauses[1:]:
+                    matched = np.intersect1d(matched, clause, assume_unique=True)
+            else:
+                matched = self._rows_for(field, value)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows
+
+    def _documents(self, rows: Sequence[int], scores: Sequence[float]):
+        return [
+            (Document(page_content=self.texts[row], metadata=self.metadatas[row], id=self.ids[row]), float(score))
+            for row, score in zip(rows, scores)
+        ]
+
+    def similarity_search_by_vector_with_score(self, embedding: Sequence[float], k: int = 4, filter: Optional[dict] = None):
+        return self.batch_search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def batch_search_by_vectors(self, embeddings: Sequence[Sequence[float]], k: int = 4, filter: Optional[dict] = None):
+        """Top-k (Document, cosine score) lists for many query vectors in one matrix product."""
+        with metrics.span("vector_search"):
+            return self._search_by_vectors(embeddings, k, filter)
+
+    def _search_by_vectors(self, embeddings: Sequence[Sequence[float]], k: int, filter: Optional[dict]):
+        queries = _normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        rows = self._candidate_rows(filter)
+        if k <= 0 or not len(self.ids) or (rows is not None and not len(rows)):
+            return [[] for _ in range(len(queries))]
+
+        if rows is None:
+            scores = queries @ self.vectors.T
+        elif len(rows) * 3 > len(self.ids):
+            # Broad filter: scoring every row and dropping columns is cheaper than copying the matching rows.
+            scores = (queries @ self.vectors.T)[:, rows]
+        else:
+            scores = queries @ self.vectors[rows].T
+        best = _top_k(scores, min(k, scores.shape[1]))
+        results = []
+        for query_scores, picks in zip(scores, best):
+            picked_rows = picks if rows is None else rows[picks]
+            results.append(self._documents(picked_rows, query_scores[picks]))
+        return results
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None):
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def batch_search_with_score(self, queries: List[str], k: int = 4, filter: Optional[dict] = None):
+        """Top-k (Document, cosine score) lists for many queries: one embedding call, one matrix product."""
+        if not queries:
+            return []
+        return self.batch_search_by_vectors(embeddings.embed_queries(self.embeddings, queries), k=k, filter=filter)
+
+    def batch_similarity_search(self, queries: List[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Document]]:
+        return [[doc for doc, _ in hits] for hits in self.batch_search_with_score(queries, k=k, filter=filter)]
+
+
+def batch_search_with_score(store, queries: List[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Tuple[Document, float]]]:
+    """Per-query top-k (Document, score) from a NumpyVectorIndex, a retriever wrapping one, or Chroma.
+
+    Scores are higher-is-better: cosine similarity for the NumPy index, LangChain's
+    relevance score for Chroma and the fused RRF score for hybrid retrievers.
+    """
+    batch = getattr(store, "batch_search_with_score", None)
+    if batch is not None:
+        return batch(queries, k=k, filter=filter)
+    if not queries:
+        return []
+
+    # LangChain Chroma: the collection answers every query embedding in one call.
+    vectors = embeddings.embed_queries(store.embeddings, queries)
+    with metrics.span("vector_search"):
+        found = store._collection.query(
+            query_embeddings=vectors, n_results=k, where=filter or None, include=["documents", "metadatas", "distances"],
+        )
+    relevance = store._select_relevance_score_fn()
+    return [
+        [
+            (Document(page_content=text, metadata=metadata or {}, id=doc_id), float(relevance(distance)))
+            for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+        ]
+        for ids, texts, metadatas, distances in zip(found["ids"], found["documents"], found["metadatas"], found["distances"])
+    ]
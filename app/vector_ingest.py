@@ -0,0 +1,188 @@
+"""Incremental sync of the RAG vector store from data/attachment and data.json.
+
+Every chunk gets an id derived from its content and metadata, so a rebuild only
+upserts chunks that are new or changed and deletes the ones that disappeared.
+Unchanged chunks are never re-embedded.
+
+    python vector_ingest.py                      # sync ../data into ../data/bus_db
+    python vector_ingest.py --dry-run --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional
+
+from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+ATTACHMENT_DIR = "../data/attachment"
+DATA_PATH = "../data/data.json"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+DEFAULT_BATCH_SIZE = 256
+
+
+def _splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+
+
+def load_bus_json_with_metadata(path: str) -> List[Document]:
+    documents = []
+
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    for district in data["districts"]:
+        district_name = district["name"]
+
+        for drop in district["dropping_points"]:
+            doc_text = (
+                f"type: dropping_point\n"
+                f"District: {district_name}\n"
+                f"Dropping Point: {drop['name']}\n"
+                f"Ticket Price: {drop['price']}"
+            )
+
+            metadata = {
+                "type": "dropping_point",
+                "district": district_name,
+                "dropping_point": drop["name"],
+                "price": drop["price"]
+            }
+
+            documents.append(Document(page_content=doc_text, metadata=metadata))
+
+    for provider in data["bus_providers"]:
+        provider_name = provider["name"]
+        coverage = ", ".join(provider["coverage_districts"])
+
+        doc_text = (
+            f"type: bus provider\n"
+            f"Bus Provider: {provider_name}\n"
+            f"Coverage Districts: {coverage}"
+        )
+
+        metadata = {
+            "type": "bus provider",
+            "provider_name": provider_name,
+            "coverage_districts": coverage
+        }
+
+        documents.append(Document(page_content=doc_text, metadata=metadata))
+
+    return documents
+
+
+def _load_and_split(path: str, root: str) -> List[Document]:
+    """Process-pool worker: read one attachment and split it into chunks."""
+    documents = TextLoader(path, autodetect_encoding=True).load()
+    # Relative source keeps chunk ids independent of the working directory.
+    for doc in documents:
+        doc.metadata["source"] = os.path.relpath(path, root).replace(os.sep, "/")
+    return _splitter().split_documents(documents)
+
+
+def load_attachments(directory: str = ATTACHMENT_DIR, pattern: str = "*.txt", workers: Optional[int] = None) -> List[Document]:
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if workers == 1 or len(paths) < 2:
+        return [chunk for path in paths for chunk in _load_and_split(path, directory)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_load_and_split, paths, [directory] * len(paths))
+        return [chunk for chunks in results for chunk in chunks]
+
+
+def load_documents(attachment_dir: str = ATTACHMENT_DIR, data_path: str = DATA_PATH, workers: Optional[int] = None) -> List[Document]:
+    """All chunks the vector store should contain, in a stable order."""
+    documents = load_attachments(attachment_dir, workers=workers)
+    documents.extend(_splitter().split_documents(load_bus_json_with_metadata(data_path)))
+    return documents
+
+
+def chunk_id(doc: Document) -> str:
+    payload = json.dumps([doc.page_content, doc.metadata], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _batched(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def sync_vector_store(vector_store, documents: List[Document], batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False) -> Dict[str, object]:
+    """Make the collection hold exactly `documents`, touching only the chunks that differ.
+
+    Ids that are not content hashes of a current chunk (including the random
+    ids left by earlier full rebuilds) are deleted.
+    """
+    started = time.perf_counter()
+    desired: Dict[str, Document] = {}
+    for doc in documents:
+        desired.setdefault(chunk_id(doc), doc)
+
+    existing = set(vector_store.get(include=[])["ids"])
+    to_add = [key for key in desired if key not in existing]
+    to_delete = [key for key in existing if key not in desired]
+
+    if not dry_run:
+        # Stores that rewrite files on every call (the NumPy index) apply the whole diff at once.
+        deferred = getattr(vector_store, "deferred_writes", None)
+        with deferred() if deferred else nullcontext():
+            for batch in _batched(to_delete, batch_size):
+                vector_store.delete(ids=batch)
+            for batch in _batched(to_add, batch_size):
+                vector_store.add_documents([desired[key] for key in batch], ids=batch)
+
+    return {
+        "seen": len(documents),
+        "chunks": len(desired),
+        "added": len(to_add),
+        "deleted": len(to_delete),
+        "unchanged": len(desired) - len(to_add),
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    import lexical_index
+    import rag_engine
+    import vector_index
+
+    parser = argparse.ArgumentParser(description="Sync the RAG vector store with data/attachment and data.json.")
+    parser.add_argument("--attachments", default=ATTACHMENT_DIR)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--store", default=vector_index.VECTOR_STORE, choices=("chroma", "numpy"))
+    parser.add_argument("--db", default=None, help="store directory (default: ../data/bus_db for chroma, ../data/bus_index/<collection> for numpy)")
+    parser.add_argument("--collection", default=rag_engine.COLLECTION_NAME)
+    parser.add_argument("--workers", type=int, default=None, help="attachment loader processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="report the diff without writing")
+    args = parser.parse_args(argv)
+
+    documents = load_documents(args.attachments, args.data, workers=args.workers)
+    if args.store == "numpy":
+        db = args.db or os.path.join(vector_index.INDEX_PATH, args.collection)
+        vector_store = vector_index.NumpyVectorIndex(db, rag_engine.get_embedding_function())
+    else:
+        db = args.db or rag_engine.CHROMA_DB_PATH
+        vector_store = rag_engine.get_chroma_client_and_collection(db, args.collection)
+    if vector_store is None:
+        raise SystemExit(f"Could not open collection '{args.collection}' at {db}.")
+
+    stats = sync_vector_store(vector_store, documents, batch_size=args.batch_size, dry_run=args.dry_run)
+    print(json.dumps(stats))
+    if not args.dry_run:
+        lexical = lexical_index.BM25Index.from_vector_store(vector_store)
+        lexical.save(lexical_index.index_path(db, args.collection))
+        print(f"BM25 index: {len(lexical.ids)} chunks, {len(lexical.vocabulary)} terms")
+        print(f"Embedding cache: {vector_store.embeddings.cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Sequential vs batched retrieval for an evaluation-sized set of queries.
+
+Uses the synthetic corpus and labelled queries of ``bench_retrieval.py``.
+Each embedding call pays ``--latency-ms`` of simulated round trip on top of the
+hashing backend, as a remote embedding API would, so the sequential run pays it
+once per query and the batched run once in total. The batched results are
+checked against the sequential ones.
+
+    python benchmarks/bench_batch_retrieval.py --queries 100 --latency-ms 40
+    python benchmarks/bench_batch_retrieval.py --store chroma
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from bench_retrieval import build_corpus, labelled_queries
+
+import embeddings
+import lexical_index
+import vector_index
+import vector_ingest
+
+
+class SlowEmbeddings:
+    """Hashing embeddings plus a fixed delay per call, counting calls."""
+
+    def __init__(self, latency_ms: float):
+        self.inner = embeddings.HashingEmbeddings()
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _call(self, fn, arg):
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return fn(arg)
+
+    def embed_documents(self, texts):
+        return self._call(self.inner.embed_documents, texts)
+
+    def embed_query(self, text):
+        return self._call(self.inner.embed_query, text)
+
+    def embed_queries(self, texts):
+        return self._call(self.inner.embed_queries, texts)
+
+
+def open_store(kind: str, path: str, embedding_function):
+    if kind == "numpy":
+        return vector_index.NumpyVectorIndex(path, embedding_function)
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma("bench_batch", embedding_function=embedding_function, persist_directory=path,
+                  collection_metadata={"hnsw:space": "cosine"})
+
+
+def compare(name: str, retriever, queries, k: int, slow: SlowEmbeddings):
+    slow.calls = 0
+    start = time.perf_counter()
+    sequential = [retriever.similarity_search(q, k=k) for q in queries]
+    sequential_s, sequential_calls = time.perf_counter() - start, slow.calls
+
+    slow.calls = 0
+    start = time.perf_counter()
+    batched = vector_index.batch_search_with_score(retriever, queries, k=k)
+    batched_s, batched_calls = time.perf_counter() - start, slow.calls
+
+    same = sum(
+        [lexical_index.fusion_key(d) for d in seq] == [lexical_index.fusion_key(d) for d, _ in batch]
+        for seq, batch in zip(sequential, batched)
+    )
+    print(f"{name:<7} sequential {sequential_s * 1000:8.1f} ms ({sequential_calls} embedding calls)   "
+          f"batched {batched_s * 1000:7.1f} ms ({batched_calls} call)   "
+          f"{sequential_s / batched_s:5.1f}x   identical top-{k}: {same}/{len(queries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--store", default="numpy", choices=["numpy", "chroma"])
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    catalog, documents = build_corpus(args.providers, 64, 4, args.seed)
+    queries = [q for q, _ in labelled_queries(catalog, args.queries, args.seed)][:args.queries]
+    slow = SlowEmbeddings(args.latency_ms)
+    print(f"{len(documents)} chunks, {len(queries)} queries, {args.store} store, {args.latency_ms:g} ms per embedding call")
+
+    with tempfile.TemporaryDirectory() as path:
+        store = open_store(args.store, path, embeddings.HashingEmbeddings())
+        vector_ingest.sync_vector_store(store, documents)
+        # Ingest at full speed, then slow down query embedding only.
+        if args.store == "numpy":
+            store.embeddings = slow
+        else:
+            store._embedding_function = slow
+        lexical = lexical_index.BM25Index.from_vector_store(store)
+
+        compare("vector", store, queries, args.k, slow)
+        compare("hybrid", lexical_index.HybridRetriever(store, lexical), queries, args.k, slow)
+
+
+if __name__ == "__main__":
+    main()
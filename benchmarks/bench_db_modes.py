@@ -0,0 +1,105 @@
+"""Requests/sec for search and booking with the sync vs async database layer.
+
+Each mode runs in its own process (DB_ASYNC is read at import time) against a
+fresh SQLite database seeded from a synthetic catalog, driving the ASGI app
+in-process with httpx at a fixed concurrency.
+
+    python benchmarks/bench_db_modes.py --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, "..", "app")
+
+
+async def drive(app, make_request, total: int, concurrency: int):
+    import httpx
+
+    statuses = Counter()
+    remaining = iter(range(total))
+
+    async def worker(client):
+        for i in remaining:
+            method, url, kwargs = make_request(i)
+            response = await client.request(method, url, **kwargs)
+            statuses[response.status_code] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"requests": total, "seconds": round(elapsed, 3), "rps": round(total / elapsed, 1), "statuses": dict(statuses)}
+
+
+def worker_main(args):
+    sys.path.insert(0, APP_DIR)
+    import main
+    import catalog
+    import startup
+
+    main.startup_event()
+    startup.wait()
+    routes = catalog.current().routes.values()
+    pairs = [(records[0].origin, records[0].destination) for records in routes]
+    max_id = max(r.id for records in routes for r in records)
+
+    rng = random.Random(0)
+
+    def search(i):
+        origin, destination = rng.choice(pairs)
+        return "GET", "/api/routes", {"params": {"origin": origin, "destination": destination}}
+
+    def book(i):
+        seat = f"{rng.randint(1, 10)}{rng.choice('ABCD')}"
+        body = {"route_id": rng.randint(1, max_id), "user_name": "bench", "user_phone": f"017{i:08d}", "seat_number": seat}
+        return "POST", "/api/book_ticket", {"json": body}
+
+    results = {}
+    for name, make_request in (("search", search), ("book", book)):
+        results[name] = asyncio.run(drive(main.app, make_request, args.requests, args.concurrency))
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args)
+        return
+
+    sys.path.insert(0, HERE)
+    from synthetic import make_catalog
+
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "data"))
+            os.makedirs(os.path.join(tmp, "app"))
+            with open(os.path.join(tmp, "data", "data.json"), "w") as f:
+                json.dump(make_catalog(providers=20, districts=30, dropping_points=5, coverage=10), f)
+
+            env = dict(os.environ, DB_ASYNC="1" if mode == "async" else "0", DATABASE_URL="sqlite:///bench.db")
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", "--concurrency", str(args.concurrency), "--requests", str(args.requests)],
+                cwd=os.path.join(tmp, "app"), env=env, capture_output=True, text=True, check=True,
+            )
+            results = json.loads(out.stdout.strip().splitlines()[-1])
+        for scenario, r in results.items():
+            print(f"{mode:<6} {scenario:<7} {r['rps']:>9.1f} req/s  ({r['requests']} in {r['seconds']}s) statuses={r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
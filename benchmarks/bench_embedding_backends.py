@@ -0,0 +1,73 @@
+"""Embedding throughput (texts/sec) for each backend in app/embeddings.py.
+
+Embeds synthetic chunks shaped like the RAG corpus in batches, then times
+single-query embedding, which is what every chat turn pays. Backends that
+cannot be loaded here (no API key, sentence-transformers not installed or
+model not downloadable) are reported and skipped. The embedding cache is
+bypassed so the numbers are raw backend cost.
+
+    python benchmarks/bench_embedding_backends.py --texts 2000 --batch-sizes 1 32 128
+    EMBEDDING_MODEL=BAAI/bge-small-en-v1.5 python benchmarks/bench_embedding_backends.py --backends sentence-transformers
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import embeddings
+
+
+def synthetic_texts(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = ("bus ticket refund policy cancel seat fare counter contact phone hotline luggage child "
+             "departure arrival district provider dropping point price taka hours booking").split()
+    texts = []
+    for i in range(count):
+        body = " ".join(rng.choice(words) for _ in range(rng.randint(20, 180)))
+        texts.append(f"type: policy\nProvider: P{i % 25}\n{body}")
+    return texts
+
+
+def bench_backend(name: str, texts, batch_sizes, queries: int):
+    try:
+        inner, model_name = embeddings.make_backend(name)
+        inner.embed_query("warm up")
+    except Exception as e:
+        print(f"{name:<22} skipped: {type(e).__name__}: {str(e).splitlines()[0][:90]}")
+        return
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for offset in range(0, len(texts), batch_size):
+            inner.embed_documents(texts[offset:offset + batch_size])
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} batch={batch_size:<5} {len(texts) / elapsed:>10.0f} texts/s   ({model_name})")
+
+    samples = []
+    for text in texts[:queries]:
+        start = time.perf_counter()
+        inner.embed_query(text[:120])
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{name:<22} query      {statistics.median(samples):>10.2f} ms median over {len(samples)} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(embeddings.BACKENDS), choices=embeddings.BACKENDS)
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 128])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts)
+    for name in args.backends:
+        bench_backend(name, texts, args.batch_sizes, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Embedding calls and latency with the on-disk embedding cache.
+
+Uses a local fake embedder (deterministic vectors, fixed per-call latency) so
+no API key is needed. Runs a cold ingest, a re-ingest, repeated queries and a
+reopen of the cache from disk, and checks that the warm passes make no
+embedding calls and that the LRU bound holds.
+
+    python benchmarks/bench_embedding_cache.py --chunks 5000 --dim 768
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import numpy as np
+
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class FakeEmbeddings:
+    """Deterministic stand-in for GoogleGenerativeAIEmbeddings that counts calls."""
+
+    def __init__(self, dim: int, latency_ms: float = 0.0):
+        self.model = "fake-embedding"
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str):
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        time.sleep(self.latency_ms / 1000)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def timed(label, fake, fn):
+    calls, texts = fake.calls, fake.texts
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<28} {elapsed:>10.1f} ms  {fake.calls - calls:>6} calls  {fake.texts - texts:>7} texts embedded")
+    return result, fake.calls - calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated cost of one embedding call")
+    args = parser.parse_args()
+
+    chunks = [f"type: dropping_point\nDistrict: D{i % 64}\nDropping Point: Stop {i}\nTicket Price: {100 + i % 900}" for i in range(args.chunks)]
+    questions = [f"What is the fare to Stop {i}?" for i in range(args.queries // 4)] * 4
+
+    with tempfile.TemporaryDirectory() as path:
+        fake = FakeEmbeddings(args.dim, args.latency_ms)
+        embeddings = CachedEmbeddings(fake, EmbeddingCache(path))
+
+        cold, _ = timed("ingest (cold)", fake, lambda: embeddings.embed_documents(chunks))
+        warm, calls = timed("re-ingest (warm)", fake, lambda: embeddings.embed_documents(chunks))
+        assert calls == 0 and np.allclose(cold, warm), "re-ingest should be served from the cache"
+
+        timed("queries (25% unique)", fake, lambda: [embeddings.embed_query(q) for q in questions])
+        print("stats:", embeddings.cache.stats())
+        embeddings.cache.flush()
+
+        reopened = CachedEmbeddings(fake, EmbeddingCache(path))
+        again, calls = timed("re-ingest after reopen", fake, lambda: reopened.embed_documents(chunks))
+        assert calls == 0 and np.allclose(cold, again), "cache should survive a restart"
+        print("stats:", reopened.cache.stats())
+
+        reopened.cache.flush()
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"on disk: {size / 1e6:.1f} MB for {reopened.cache.stats()['entries']} vectors")
+
+    with tempfile.TemporaryDirectory() as path:
+        fake = FakeEmbeddings(args.dim)
+        capacity = max(1, args.chunks // 10)
+        embeddings = CachedEmbeddings(fake, EmbeddingCache(path, capacity=capacity))
+        embeddings.embed_documents(chunks)
+        assert embeddings.cache.stats()["entries"] == capacity
+        _, calls = timed("LRU: newest chunks", fake, lambda: embeddings.embed_documents(chunks[-capacity:]))
+        assert calls == 0, "most recently used entries should survive eviction"
+        _, calls = timed("LRU: evicted chunks", fake, lambda: embeddings.embed_documents(chunks[:capacity]))
+        assert calls == 1
+        print("stats:", embeddings.cache.stats())
+        embeddings.cache.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Route ingestion throughput and memory as the catalog product grows.
+
+Each size runs in a fresh process so peak RSS is not inherited from a
+previous run. Four passes are timed per size: a cold load into an empty
+table, an unchanged re-ingest, a re-ingest with some fares changed and one
+provider dropped, and a re-ingest that brings that provider back. One of the
+dropped provider's routes has a booking, so the third pass retires it; the
+bench checks that it can then no longer be searched or booked, while the
+booking still resolves it, and that the last pass makes it live again.
+
+    python benchmarks/bench_ingest.py --coverage 10 20 40
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+
+def check_retired(db, route_id: int, retired: bool):
+    """Assert that `route_id` is (or is not) hidden from search and booking, and still resolves for history."""
+    from fastapi import HTTPException
+
+    import catalog as route_catalog
+    import crud
+    import models
+
+    live_ids = {row[0] for row in db.execute(models.route_select())}
+    catalog_ids = {r.id for records in route_catalog.build_catalog(db, 0).routes.values() for r in records}
+    assert (route_id in live_ids) is not retired and (route_id in catalog_ids) is not retired, route_id
+    assert db.execute(crud.routes_by_id_select([route_id])).first() is not None, route_id
+    try:
+        crud.require_live_route(db.get(models.BusRoute, route_id))
+        bookable = True
+    except HTTPException as e:
+        assert e.status_code == 410, e.status_code
+        bookable = False
+    assert bookable is not retired, route_id
+
+
+def run_size(args, coverage, queue):
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+
+    import ingest
+    import models
+    from database import Base
+    from synthetic import make_catalog
+
+    catalog = make_catalog(args.providers, args.districts, args.dropping_points, coverage)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            results.append(("cold", ingest.sync_catalog(db, catalog, args.batch_size)))
+            results.append(("unchanged", ingest.sync_catalog(db, catalog, args.batch_size)))
+
+            dropped = catalog["bus_providers"][-1]
+            booked_route = db.execute(
+                select(models.BusRoute.id).join(models.Provider).where(models.Provider.name == dropped["name"]).limit(1)
+            ).scalar_one()
+            db.add(models.Booking(route_id=booked_route, user_name="bench", user_phone="01700000000", seat_number="1A"))
+            db.commit()
+
+            for district in catalog["districts"][::10]:
+                for dp in district["dropping_points"]:
+                    dp["price"] += 10
+            catalog["bus_providers"].pop()
+            results.append(("changed", ingest.sync_catalog(db, catalog, args.batch_size)))
+            check_retired(db, booked_route, retired=True)
+
+            catalog["bus_providers"].append(dropped)
+            results.append(("restored", ingest.sync_catalog(db, catalog, args.batch_size)))
+            check_retired(db, booked_route, retired=False)
+        engine.dispose()
+    queue.put((coverage, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=int, default=50)
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--dropping-points", type=int, default=8)
+    parser.add_argument("--coverage", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'coverage':>8} {'pass':<10} {'rows':>10} {'ins':>9} {'upd':>8} {'del':>8} {'retired':>8} {'secs':>8} {'rows/s':>10} {'peak MiB':>9}")
+    for coverage in args.coverage:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_size, args=(args, coverage, queue))
+        proc.start()
+        coverage, results = queue.get()
+        proc.join()
+        for name, s in results:
+            print(
+                f"{coverage:>8} {name:<10} {s['seen']:>10,} {s['inserted']:>9,} {s['updated']:>8,} {s['deleted']:>8,} "
+                f"{s['retired']:>8,} {s['seconds']:>8.2f} {s['rows_per_sec']:>10,} {s['peak_rss_mb']!s:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
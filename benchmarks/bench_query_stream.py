@@ -0,0 +1,168 @@
+"""Time-to-first-token, coalescing and event-loop responsiveness of /api/query_info.
+
+The API runs under uvicorn with the fake LLM (``RAG_LLM=fake``: fixed
+first-token delay, then one word every few ms), hashing embeddings and a NumPy
+index of synthetic policy documents, all in a temporary directory. A burst of
+concurrent streaming clients asks ``--distinct`` different questions, so most
+requests share an in-flight upstream call. A second burst repeats the same
+questions and is served by the answer cache. While the bursts run, ``GET /`` is
+polled to show the event loop stays responsive.
+
+    python benchmarks/bench_query_stream.py --clients 64 --distinct 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKDIR = tempfile.mkdtemp(prefix="bench_query_stream_")
+os.environ.update({
+    "RAG_LLM": "fake",
+    "EMBEDDING_BACKEND": "hashing",
+    "VECTOR_STORE": "numpy",
+    "RETRIEVAL_MODE": "hybrid",
+    "VECTOR_INDEX_PATH": os.path.join(WORKDIR, "bus_index"),
+    "EMBEDDING_CACHE_PATH": os.path.join(WORKDIR, "embedding_cache"),
+    "ANSWER_CACHE_PATH": os.path.join(WORKDIR, "answer_cache.db"),
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'businfo.db')}",
+})
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+warnings.filterwarnings("ignore")
+
+import httpx
+import uvicorn
+from langchain_core.documents import Document
+
+import lexical_index
+import rag_engine
+import vector_ingest
+from synthetic import make_catalog, make_policy_documents
+
+QUESTIONS = (
+    "What is the cancellation policy of {provider}?",
+    "How can I contact {provider}?",
+    "How much luggage can I carry with {provider}?",
+)
+
+
+def build_index(providers: int) -> list:
+    catalog = make_catalog(providers, districts=16, dropping_points=2, seed=5)
+    documents = [Document(page_content=text, metadata=metadata) for text, metadata in make_policy_documents(catalog, seed=5)]
+    store = rag_engine.get_vector_store()
+    vector_ingest.sync_vector_store(store, documents)
+    lexical_index.BM25Index.from_vector_store(store).save(
+        lexical_index.index_path(rag_engine.vector_store_path(), rag_engine.COLLECTION_NAME)
+    )
+    return [q.format(provider=p["name"]) for p in catalog["bus_providers"] for q in QUESTIONS]
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def ask(client: httpx.AsyncClient, question: str) -> dict:
+    start = time.perf_counter()
+    first = None
+    done = {}
+    async with client.stream("POST", "/api/query_info", json={"query": question}) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                if event == "token" and first is None:
+                    first = time.perf_counter()
+                elif event in ("done", "error"):
+                    done = dict(json.loads(line[6:]), event=event)
+    return {"ttft": (first - start) * 1000 if first else None, "total": (time.perf_counter() - start) * 1000, **done}
+
+
+async def ping(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def burst(base_url: str, questions: list) -> tuple:
+    limits = httpx.Limits(max_connections=len(questions) + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        stop, pings = asyncio.Event(), []
+        pinger = asyncio.create_task(ping(client, stop, pings))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(ask(client, q) for q in questions))
+        wall = time.perf_counter() - start
+        stop.set()
+        await pinger
+    return results, pings, wall
+
+
+def report(name: str, results: list, pings: list, wall: float, llm_calls: int):
+    errors = [r for r in results if r.get("event") != "done"]
+    ttft = [r["ttft"] for r in results if r["ttft"] is not None]
+    total = [r["total"] for r in results]
+    sources = {}
+    for r in results:
+        key = r.get("source", "error") + (" (coalesced)" if r.get("coalesced") else "")
+        sources[key] = sources.get(key, 0) + 1
+    print(f"{name}: {len(results)} requests in {wall:.2f} s, {llm_calls} upstream LLM calls, {len(errors)} errors")
+    print(f"  sources: {sources}")
+    if ttft:
+        print(f"  client TTFT  p50 {statistics.median(ttft):7.1f} ms  p95 {percentile(ttft, 0.95):7.1f} ms")
+    print(f"  client total p50 {statistics.median(total):7.1f} ms  p95 {percentile(total, 0.95):7.1f} ms")
+    if pings:
+        print(f"  GET / during burst: {len(pings)} pings, p50 {statistics.median(pings):5.1f} ms  max {max(pings):5.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=8, help="Different questions among the clients")
+    parser.add_argument("--providers", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    os.chdir(WORKDIR)
+    questions = build_index(args.providers)[:args.distinct]
+    burst_questions = [questions[i % len(questions)] for i in range(args.clients)]
+
+    import main as api
+    import rag_stream
+    import startup
+
+    server = uvicorn.Server(uvicorn.Config(api.app, port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            sys.exit("API startup failed")
+        time.sleep(0.05)
+    # Ingestion and the RAG engine start in the background; measure the warm server.
+    startup.wait()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    llm = rag_stream.get_llm()
+    print(f"fake LLM: first token after {llm.first_token_ms:g} ms, {llm.token_ms:g} ms per word; "
+          f"max {rag_stream.RAG_MAX_CONCURRENCY} concurrent LLM calls")
+
+    results, pings, wall = asyncio.run(burst(base_url, burst_questions))
+    report("cold burst", results, pings, wall, llm.calls)
+    calls = llm.calls
+    results, pings, wall = asyncio.run(burst(base_url, burst_questions))
+    report("warm burst", results, pings, wall, llm.calls - calls)
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
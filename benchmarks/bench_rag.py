@@ -0,0 +1,156 @@
+"""RAG pipeline benchmark with local fake embedder and LLM stand-ins.
+
+Builds a RagEngine over the synthetic corpus of ``bench_retrieval.py``. The
+engine uses a NumPy index, the embedding cache, the hybrid retriever and the
+answer cache. Embedding calls and Gemini are replaced by ``fakes``, so no API
+key is needed and latency is set by the flags below. Scenarios:
+
+- retrieve: one query at a time (embedding + vector + BM25 + fusion);
+- retrieve_batch: ``RagEngine.retrieve_many`` in batches of ``--batch-size``;
+- answer_cold: ``get_rag_answer``-style answers for new questions, ``--concurrency`` at a time;
+- answer_warm: the same questions again, served by the answer cache;
+- stream: the SSE path (``rag_stream.answer_events``) for new questions, latency = time to first token.
+
+    python benchmarks/bench_rag.py --embed-latency-ms 40 --llm-first-token-ms 400 --out rag.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKDIR = tempfile.mkdtemp(prefix="bench_rag_")
+os.environ.update({
+    "RAG_LLM": "gemini",
+    "EMBEDDING_BACKEND": "hashing",
+    "VECTOR_STORE": "numpy",
+    "ANSWER_CACHE_PATH": os.path.join(WORKDIR, "answer_cache.db"),
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'businfo.db')}",
+})
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+from bench_retrieval import build_corpus, labelled_queries
+from fakes import FakeGeminiClient, LatencyEmbeddings
+from report import latency_summary, scenario_result, write_results
+
+import lexical_index
+import rag_engine
+import vector_index
+import vector_ingest
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def build_engine(args) -> tuple:
+    _, documents = build_corpus(args.providers, args.districts, args.dropping_points, args.seed)
+    embedder = LatencyEmbeddings(args.embed_latency_ms)
+    cached = CachedEmbeddings(embedder, EmbeddingCache(os.path.join(WORKDIR, "embedding_cache")), embedder.model)
+    store = vector_index.NumpyVectorIndex(os.path.join(WORKDIR, "bus_index"), cached)
+    vector_ingest.sync_vector_store(store, documents)
+    retriever = store
+    if args.mode != "vector":
+        lexical = lexical_index.BM25Index.from_vector_store(store)
+        retriever = lexical if args.mode == "lexical" else lexical_index.HybridRetriever(store, lexical)
+    client = FakeGeminiClient(args.llm_first_token_ms, args.llm_token_ms)
+    engine = rag_engine.RagEngine("bench", model="fake-llm", retriever=retriever, embedding_function=cached, client=client)
+    engine.warm_up()
+    return engine, embedder, client, len(documents)
+
+
+def timed_calls(fn, items, concurrency: int) -> tuple:
+    def one(item):
+        start = time.perf_counter()
+        fn(item)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        samples = [one(item) for item in items]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(one, items))
+    return time.perf_counter() - start, samples
+
+
+def counted(name: str, embedder, client, run) -> dict:
+    embed_calls, llm_calls = embedder.calls, client.calls
+    seconds, samples = run()
+    return scenario_result(name, seconds, samples, embedding_calls=embedder.calls - embed_calls, llm_calls=client.calls - llm_calls)
+
+
+async def stream_answers(queries, concurrency: int) -> tuple:
+    import rag_stream
+
+    semaphore = asyncio.Semaphore(concurrency)
+    ttft, totals, sources = [], [], Counter()
+
+    async def one(query):
+        async with semaphore:
+            start = time.perf_counter()
+            first = None
+            async for event, data in rag_stream.answer_events(query):
+                if event == "token" and first is None:
+                    first = time.perf_counter()
+                elif event != "token":
+                    sources[data.get("source", event)] += 1
+            ttft.append(((first or time.perf_counter()) - start) * 1000)
+            totals.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    return time.perf_counter() - start, ttft, totals, dict(sources)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--mode", default="hybrid", choices=["hybrid", "vector", "lexical"])
+    parser.add_argument("--embed-latency-ms", type=float, default=40)
+    parser.add_argument("--llm-first-token-ms", type=float, default=400)
+    parser.add_argument("--llm-token-ms", type=float, default=15)
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--dropping-points", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--out", default="-", help="JSON results path, or - for stdout")
+    args = parser.parse_args()
+
+    engine, embedder, client, chunks = build_engine(args)
+    catalog, _ = build_corpus(args.providers, args.districts, args.dropping_points, args.seed)
+    queries = [q for q, _ in labelled_queries(catalog, args.queries, args.seed)]
+    # Separate question sets, so every scenario starts with cold embedding and answer caches.
+    sets = [[f"{q} ({tag})" for q in queries[:args.queries]] for tag in ("r", "b", "a", "s")]
+    print(f"{chunks} chunks, {len(sets[0])} queries per scenario, {args.mode} retrieval", file=sys.stderr)
+
+    results = [
+        counted("retrieve", embedder, client, lambda: timed_calls(engine.retrieve, sets[0], 1)),
+        counted("retrieve_batch", embedder, client, lambda: timed_calls(
+            engine.retrieve_many, [sets[1][i:i + args.batch_size] for i in range(0, len(sets[1]), args.batch_size)], 1)),
+        counted("answer_cold", embedder, client, lambda: timed_calls(engine.answer, sets[2], args.concurrency)),
+        counted("answer_warm", embedder, client, lambda: timed_calls(engine.answer, sets[2], args.concurrency)),
+    ]
+    results[1]["queries_per_s"] = round(len(sets[1]) / results[1]["seconds"], 2)
+
+    rag_engine._engine = engine
+    # Empty tables: the router finds no districts, so every question takes the RAG path.
+    import models
+    from database import engine as db_engine
+
+    models.Base.metadata.create_all(bind=db_engine)
+    embed_calls, llm_calls = embedder.calls, client.calls
+    seconds, ttft, totals, sources = asyncio.run(stream_answers(sets[3], args.concurrency))
+    results.append(scenario_result(
+        "stream", seconds, ttft, total_ms=latency_summary(totals), sources=sources,
+        embedding_calls=embedder.calls - embed_calls, llm_calls=client.calls - llm_calls,
+    ))
+    write_results("bench_rag", args, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
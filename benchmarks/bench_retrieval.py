@@ -0,0 +1,122 @@
+"""Recall@k and latency for lexical-only, vector-only and hybrid (RRF) retrieval.
+
+The corpus is a synthetic catalog (``synthetic.make_catalog``) turned into the
+same dropping-point/provider documents as ``vector_ingest``, plus provider
+policy sections. Queries come from the labelled templates in
+``rag_queries.json``; a query counts as recalled at k when a chunk matching its
+``relevant`` metadata is in the top k. Vectors come from the configured
+embedding backend (hashing by default, so it runs offline) in a NumPy index.
+
+    python benchmarks/bench_retrieval.py --providers 40 --per-template 25
+    python benchmarks/bench_retrieval.py --backend sentence-transformers
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+warnings.filterwarnings("ignore")
+
+from langchain_core.documents import Document
+
+import embeddings
+import lexical_index
+import vector_index
+import vector_ingest
+from synthetic import make_catalog, make_policy_documents
+
+
+def build_corpus(providers: int, districts: int, dropping_points: int, seed: int):
+    catalog = make_catalog(providers, districts, dropping_points, coverage=min(6, districts), seed=seed)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(catalog, f)
+    try:
+        documents = vector_ingest.load_bus_json_with_metadata(f.name)
+    finally:
+        os.unlink(f.name)
+    documents.extend(Document(page_content=text, metadata=metadata) for text, metadata in make_policy_documents(catalog, seed))
+    return catalog, documents
+
+
+def labelled_queries(catalog: dict, per_template: int, seed: int):
+    with open(os.path.join(HERE, "rag_queries.json")) as f:
+        templates = json.load(f)
+    rng = random.Random(seed)
+    entities = {
+        "provider": [{"provider": p["name"]} for p in catalog["bus_providers"]],
+        "dropping_point": [
+            {"district": d["name"], "dropping_point": point["name"]}
+            for d in catalog["districts"] for point in d["dropping_points"]
+        ],
+    }
+    queries = []
+    for template in templates:
+        for values in rng.sample(entities[template["entity"]], min(per_template, len(entities[template["entity"]]))):
+            relevant = {field: value.format(**values) for field, value in template["relevant"].items()}
+            queries.append((template["template"].format(**values), relevant))
+    return queries
+
+
+def is_relevant(doc: Document, relevant: dict) -> bool:
+    return all(doc.metadata.get(field) == value for field, value in relevant.items())
+
+
+def evaluate(name: str, retriever, queries, ks):
+    depth = max(ks)
+    hits = {k: 0 for k in ks}
+    samples = []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        results = retriever.similarity_search(query, k=depth)
+        samples.append((time.perf_counter() - start) * 1000)
+        first = next((rank for rank, doc in enumerate(results, start=1) if is_relevant(doc, relevant)), None)
+        for k in ks:
+            hits[k] += first is not None and first <= k
+    samples.sort()
+    recall = "  ".join(f"R@{k} {hits[k] / len(queries):.3f}" for k in ks)
+    print(f"{name:<8} {recall}   median {statistics.median(samples):6.2f} ms  p95 {samples[int(0.95 * (len(samples) - 1))]:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--dropping-points", type=int, default=4)
+    parser.add_argument("--per-template", type=int, default=25)
+    parser.add_argument("--backend", default="hashing", choices=embeddings.BACKENDS)
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 4, 10])
+    parser.add_argument("--vector-k", type=int, default=lexical_index.HYBRID_VECTOR_K)
+    parser.add_argument("--lexical-k", type=int, default=lexical_index.HYBRID_LEXICAL_K)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    catalog, documents = build_corpus(args.providers, args.districts, args.dropping_points, args.seed)
+    queries = labelled_queries(catalog, args.per_template, args.seed)
+    inner, _ = embeddings.make_backend(args.backend)
+    print(f"{len(documents)} chunks, {len(queries)} labelled queries, {args.backend} embeddings")
+
+    with tempfile.TemporaryDirectory() as path:
+        store = vector_index.NumpyVectorIndex(path, inner)
+        vector_ingest.sync_vector_store(store, documents)
+        start = time.perf_counter()
+        lexical = lexical_index.BM25Index.from_vector_store(store)
+        lexical.save(lexical_index.index_path(path, "bench"))
+        lexical = lexical_index.BM25Index.load(lexical_index.index_path(path, "bench"))
+        print(f"BM25 build + save + load: {(time.perf_counter() - start) * 1000:.1f} ms, {len(lexical.vocabulary)} terms")
+
+        hybrid = lexical_index.HybridRetriever(store, lexical, vector_k=args.vector_k, lexical_k=args.lexical_k)
+        evaluate("lexical", lexical, queries, args.ks)
+        evaluate("vector", store, queries, args.ks)
+        evaluate("hybrid", hybrid, queries, args.ks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Route search latency as the bus_routes table grows.
+
+Times the indexed SQL lookup in ``crud.get_buses_by_route`` (district names
+resolved to ids, then one range scan on (origin_id, destination_id)) and the
+in-memory route catalog that serves ``/api/routes``.
+
+    python benchmarks/bench_route_search.py --sizes 10000 100000 1000000
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import catalog
+import crud
+import ingest
+from database import Base
+from synthetic import make_catalog, route_count
+
+
+def catalog_for_size(rows: int, districts: int, coverage: int, dropping_points: int) -> dict:
+    per_provider = coverage * (coverage - 1) * dropping_points
+    return make_catalog(math.ceil(rows / per_provider), districts, dropping_points, coverage)
+
+
+def search_request(origin: str, destination: str) -> Request:
+    query = f"origin={origin.upper()}&destination={destination.lower()}".replace(" ", "+")
+    return Request({"type": "http", "query_string": query.encode(), "headers": []})
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(fn, queries):
+    samples = []
+    for origin, destination in queries:
+        start = time.perf_counter()
+        fn(origin, destination)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), percentile(samples, 99)
+
+
+def sample_pairs(data: dict, count: int, seed: int = 42):
+    rng = random.Random(seed)
+    providers = data["bus_providers"]
+    pairs = []
+    for _ in range(count):
+        covered = rng.choice(providers)["coverage_districts"]
+        pairs.append(tuple(rng.sample(covered, 2)))
+    return pairs
+
+
+def run(size: int, args):
+    data = catalog_for_size(size, args.districts, args.coverage, args.dropping_points)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            ingest.sync_catalog(db, data)
+        with engine.connect() as conn:
+            plan = conn.execute(
+                text("EXPLAIN QUERY PLAN SELECT id FROM bus_routes WHERE origin_id = 1 AND destination_id = 2")
+            ).all()
+
+        sample = sample_pairs(data, args.queries)
+        results = {}
+        with Session() as db:
+            results["indexed"] = measure(lambda o, d: crud.get_buses_by_route(db, search_request(o, d)), sample)
+            route_catalog = catalog.build_catalog(db, version=1)
+            results["catalog"] = measure(lambda o, d: [r.as_dict() for r in route_catalog.search(o, d)], sample)
+        engine.dispose()
+
+    print(f"\nrows={route_count(data):,}  plan: {plan[-1][-1]}")
+    for name, (p50, p99) in results.items():
+        print(f"  {name:<10} p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--coverage", type=int, default=32)
+    parser.add_argument("--dropping-points", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
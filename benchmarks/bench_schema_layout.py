@@ -0,0 +1,134 @@
+"""Normalized route schema vs the old string-per-row layout.
+
+For each synthetic catalog size this builds two SQLite files: the previous
+``bus_routes`` layout (provider/origin/destination/dropping point repeated as
+strings on every row, plus normalized key columns and their index) and the
+current integer-key layout written by ``ingest.sync_catalog``. It reports
+file size, ingest time and search latency for both.
+
+    python benchmarks/bench_schema_layout.py --coverage 16 32 48
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import ingest
+import models
+from bench_route_search import measure, sample_pairs, search_request
+from database import Base
+from synthetic import make_catalog, route_count
+
+LEGACY_DDL = [
+    """CREATE TABLE bus_routes (
+        id INTEGER PRIMARY KEY, provider_name VARCHAR, origin VARCHAR, destination VARCHAR,
+        origin_key VARCHAR, destination_key VARCHAR, dropping_point VARCHAR,
+        departure_time VARCHAR, fare FLOAT, total_seats INTEGER)""",
+    "CREATE INDEX ix_bus_routes_provider_name ON bus_routes (provider_name)",
+    "CREATE INDEX ix_bus_routes_origin ON bus_routes (origin)",
+    "CREATE INDEX ix_bus_routes_destination ON bus_routes (destination)",
+    "CREATE INDEX ix_bus_routes_search ON bus_routes (origin_key, destination_key)",
+]
+
+
+def legacy_rows(data: dict):
+    district_lookup = {d["name"]: d["dropping_points"] for d in data["districts"]}
+    for provider in data["bus_providers"]:
+        covered = provider["coverage_districts"]
+        for origin in covered:
+            for destination in covered:
+                if origin == destination:
+                    continue
+                for dp in district_lookup[destination]:
+                    yield {
+                        "provider_name": provider["name"], "origin": origin, "destination": destination,
+                        "origin_key": models.normalize_key(origin), "destination_key": models.normalize_key(destination),
+                        "dropping_point": dp["name"], "fare": dp["price"], "total_seats": 40,
+                    }
+
+
+def build_legacy(path: str, data: dict, batch_size: int = 5000):
+    engine = create_engine(f"sqlite:///{path}")
+    started = time.perf_counter()
+    insert = text(
+        "INSERT INTO bus_routes (provider_name, origin, destination, origin_key, destination_key, dropping_point, fare, total_seats) "
+        "VALUES (:provider_name, :origin, :destination, :origin_key, :destination_key, :dropping_point, :fare, :total_seats)"
+    )
+    with engine.begin() as conn:
+        for ddl in LEGACY_DDL:
+            conn.execute(text(ddl))
+        batch = []
+        for row in legacy_rows(data):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.execute(insert, batch)
+                batch = []
+        if batch:
+            conn.execute(insert, batch)
+    return engine, time.perf_counter() - started
+
+
+def build_normalized(path: str, data: dict):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with sessionmaker(bind=engine)() as db:
+        ingest.sync_catalog(db, data)
+    return engine, time.perf_counter() - started
+
+
+def run(coverage: int, args):
+    data = make_catalog(args.providers, args.districts, args.dropping_points, coverage)
+    sample = sample_pairs(data, args.queries)
+    print(f"\ncoverage={coverage} routes={route_count(data):,}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        engine, seconds = build_legacy(legacy_path, data)
+        with sessionmaker(bind=engine)() as db:
+            def legacy_search(origin, destination):
+                rows = db.execute(
+                    text("SELECT * FROM bus_routes WHERE origin_key = :o AND destination_key = :d ORDER BY id"),
+                    {"o": models.normalize_key(origin), "d": models.normalize_key(destination)},
+                )
+                return [dict(row._mapping) for row in rows]
+            p50, p99 = measure(legacy_search, sample)
+        engine.dispose()
+        report("strings", os.path.getsize(legacy_path), seconds, p50, p99)
+
+        normalized_path = os.path.join(tmp, "normalized.db")
+        engine, seconds = build_normalized(normalized_path, data)
+        with sessionmaker(bind=engine)() as db:
+            p50, p99 = measure(lambda o, d: crud.get_buses_by_route(db, search_request(o, d)), sample)
+        engine.dispose()
+        report("int keys", os.path.getsize(normalized_path), seconds, p50, p99)
+
+
+def report(name, size_bytes, seconds, p50, p99):
+    print(f"  {name:<9} size={size_bytes / 1024 / 1024:8.1f} MiB  ingest={seconds:7.2f}s  search p50={p50:6.2f} ms p99={p99:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=int, default=60)
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--dropping-points", type=int, default=8)
+    parser.add_argument("--coverage", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for coverage in args.coverage:
+        run(coverage, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Per-endpoint serialization cost: ORM + Pydantic vs tuple rows + direct JSON.
+
+"before" mirrors the previous handlers: hydrate ORM objects, validate each
+row through the Pydantic schema, then let FastAPI's jsonable_encoder and
+json.dumps produce the body. "after" is what the endpoints do now.
+
+    python benchmarks/bench_serialization.py --bookings 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import joinedload, sessionmaker
+
+import catalog
+import crud
+import ingest
+import models
+import schemas
+import serializers
+from bench_route_search import search_request
+from database import Base
+from synthetic import make_catalog
+
+
+def timeit(fn, repeat: int):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dropping-points", type=int, default=40, help="routes per provider and city pair")
+    parser.add_argument("--bookings", type=int, default=1000, help="bookings for the looked-up phone number")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    data = make_catalog(providers=30, districts=10, dropping_points=args.dropping_points, coverage=10)
+    origin, destination = data["bus_providers"][0]["coverage_districts"][:2]
+    phone = "01700000000"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            ingest.sync_catalog(db, data)
+            db.execute(insert(models.Booking), [
+                {"route_id": 1 + i % 500, "user_name": "Bench", "user_phone": phone, "seat_number": "1A", "status": "Booked"}
+                for i in range(args.bookings)
+            ])
+            db.commit()
+            route_catalog = catalog.build_catalog(db, version=1)
+
+        booking_list = TypeAdapter(List[schemas.Booking])
+
+        def search_before():
+            with Session() as db:
+                rows = db.query(models.BusRoute).filter(
+                    models.BusRoute.origin_id == crud.district_id_subquery(origin),
+                    models.BusRoute.destination_id == crud.district_id_subquery(destination),
+                ).all()
+                validated = [schemas.BusRoute.model_validate(r) for r in rows]
+                return json.dumps(jsonable_encoder(validated)).encode()
+
+        def search_after_sql():
+            with Session() as db:
+                return serializers.dumps(crud.get_buses_by_route(db, search_request(origin, destination)))
+
+        def bookings_before():
+            with Session() as db:
+                rows = db.query(models.Booking).options(joinedload(models.Booking.route)).filter(
+                    models.Booking.user_phone == phone
+                ).all()
+                return json.dumps(jsonable_encoder(booking_list.validate_python(rows))).encode()
+
+        def bookings_after():
+            with Session() as db:
+                bookings, _ = crud.get_bookings_by_phone(db, phone, limit=args.bookings)
+                return serializers.dumps(bookings)
+
+        cases = [
+            ("/api/routes", "before: ORM + Pydantic", search_before),
+            ("/api/routes", "after: SQL tuples", search_after_sql),
+            ("/api/routes", "after: catalog bytes", lambda: route_catalog.search_json(origin, destination)),
+            ("/api/bookings", "before: ORM + Pydantic", bookings_before),
+            ("/api/bookings", "after: SQL tuples", bookings_after),
+        ]
+        print(f"encoder: {'orjson' if serializers.orjson else 'json'}")
+        for endpoint, name, fn in cases:
+            ms, size = timeit(fn, args.repeat)
+            print(f"  {endpoint:<14} {name:<24} {ms:8.3f} ms  ({size:,} bytes)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
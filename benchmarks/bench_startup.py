@@ -0,0 +1,134 @@
+"""Cold-start cost of the API: module import time and time to first request / readiness.
+
+Every sample runs in a fresh interpreter, so nothing is cached in-process.
+
+- import: ``import <module>`` for the API entry point and the RAG modules.
+- serve: uvicorn is started on a new SQLite database seeded from a synthetic
+  ``data.json``. The bench records the time from process start until GET /
+  answers (first request), until GET /api/routes returns 200, and until GET
+  /ready reports every startup task done. This runs once with the tasks in the
+  background and once with ``STARTUP_BLOCKING=1`` (ingestion and the RAG
+  engine inside the startup hook) for comparison.
+
+Embeddings use the hashing backend and the NumPy index, so no network is used.
+
+    python benchmarks/bench_startup.py --runs 5 --out startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+import httpx
+
+from report import scenario_result, write_results
+from synthetic import make_catalog, route_count
+
+MODULES = ("main", "rag_engine", "rag_stream")
+
+
+def base_env(workdir: str) -> dict:
+    return dict(
+        os.environ,
+        EMBEDDING_BACKEND="hashing",
+        VECTOR_STORE="numpy",
+        VECTOR_INDEX_PATH=os.path.join(workdir, "bus_index"),
+        EMBEDDING_CACHE_PATH=os.path.join(workdir, "embedding_cache"),
+        ANSWER_CACHE_PATH=os.path.join(workdir, "answer_cache.db"),
+        PYTHONWARNINGS="ignore",
+    )
+
+
+def import_ms(module: str, env: dict) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_once(workdir: str, env: dict, run: int, timeout: float) -> dict:
+    """Milliseconds from spawning uvicorn to the first answer of each probe."""
+    port = free_port()
+    env = dict(env, DATABASE_URL=f"sqlite:///{os.path.join(workdir, f'businfo_{run}.db')}")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_DIR, "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.join(workdir, "app"), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    probes = {"first_request": "/", "first_search": "/api/routes?origin=District 0000&destination=District 0001", "ready": "/ready"}
+    reached = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while len(reached) < len(probes):
+                if process.poll() is not None:
+                    raise SystemExit(f"uvicorn exited with status {process.returncode}")
+                if time.perf_counter() - start > timeout:
+                    raise SystemExit(f"Server not ready after {timeout:g} s: {sorted(set(probes) - set(reached))}")
+                for name, path in probes.items():
+                    if name in reached:
+                        continue
+                    try:
+                        ok = client.get(path).status_code == 200
+                    except httpx.TransportError:
+                        break
+                    if ok:
+                        reached[name] = (time.perf_counter() - start) * 1000
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return reached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Samples per measurement")
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--out", default="-", help="JSON results path, or - for stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    data = make_catalog(args.providers, args.districts, 4, 8, seed=1)
+    os.makedirs(os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "app"))
+    with open(os.path.join(workdir, "data", "data.json"), "w") as f:
+        json.dump(data, f)
+    env = base_env(workdir)
+    print(f"{route_count(data)} routes to ingest per cold start", file=sys.stderr)
+
+    results = []
+    for module in MODULES:
+        start = time.perf_counter()
+        samples = [import_ms(module, env) for _ in range(args.runs)]
+        results.append(scenario_result(f"import {module}", time.perf_counter() - start, samples))
+
+    run = 0
+    for mode, blocking in (("background", "0"), ("blocking", "1")):
+        reached = []
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            reached.append(serve_once(workdir, dict(env, STARTUP_BLOCKING=blocking), run, args.timeout))
+            run += 1
+        seconds = time.perf_counter() - start
+        for probe in reached[0]:
+            results.append(scenario_result(f"{probe} ({mode})", seconds, [r[probe] for r in reached], startup_blocking=blocking == "1"))
+    write_results("bench_startup", args, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
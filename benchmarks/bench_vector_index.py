@@ -0,0 +1,129 @@
+"""Query latency: Chroma collection vs the flat NumPy index, at growing corpus sizes.
+
+Both stores get the same random unit vectors (a precomputed-vector embedder, so
+no embedding model is involved) with ``type``/``district`` metadata like the
+RAG corpus. Reports median and p99 latency for single top-k queries, filtered
+queries and a batch of queries, plus Chroma's recall@k against the exact
+NumPy results (Chroma uses an approximate HNSW graph).
+
+    python benchmarks/bench_vector_index.py --sizes 1000 10000 100000 --dim 768
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+warnings.filterwarnings("ignore")
+
+import numpy as np
+from langchain_core.documents import Document
+
+from vector_index import NumpyVectorIndex
+
+
+class PrecomputedEmbeddings:
+    """Returns stored vectors for "doc-<n>" texts; queries are passed as vectors directly."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return self.vectors[[int(t.split("-", 1)[1]) for t in texts]].tolist()
+
+    def embed_query(self, text):
+        raise NotImplementedError("queries go through *_by_vector")
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def timed(fn, items):
+    samples, results = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), percentile(samples, 99), results
+
+
+def corpus(size: int, dim: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [
+        Document(page_content=f"doc-{i}", metadata={"type": "dropping_point" if i % 4 else "bus provider", "district": f"D{i % 64}"})
+        for i in range(size)
+    ]
+    return vectors, documents
+
+
+def bench_size(size: int, dim: int, k: int, queries: int, batch: int, skip_chroma: bool):
+    vectors, documents = corpus(size, dim, seed=size)
+    ids = [str(i) for i in range(size)]
+    embedder = PrecomputedEmbeddings(vectors)
+    rng = np.random.default_rng(1)
+    query_vectors = rng.standard_normal((queries, dim), dtype=np.float32).tolist()
+    where = {"type": "dropping_point"}
+    print(f"\n{size} chunks, dim={dim}, k={k}")
+
+    with tempfile.TemporaryDirectory() as path:
+        index = NumpyVectorIndex(os.path.join(path, "numpy"), embedder)
+        start = time.perf_counter()
+        with index.deferred_writes():
+            for offset in range(0, size, 5000):
+                index.add_documents(documents[offset:offset + 5000], ids=ids[offset:offset + 5000])
+        index = NumpyVectorIndex(os.path.join(path, "numpy"), embedder)
+        print(f"  numpy  build {time.perf_counter() - start:8.2f} s")
+
+        med, p99, exact = timed(lambda q: index.similarity_search_by_vector(q, k=k), query_vectors)
+        print(f"  numpy  top-{k:<3}            median {med:7.3f} ms  p99 {p99:7.3f} ms")
+        med, p99, _ = timed(lambda q: index.similarity_search_by_vector(q, k=k, filter=where), query_vectors)
+        print(f"  numpy  top-{k:<3} filtered   median {med:7.3f} ms  p99 {p99:7.3f} ms")
+        batches = [query_vectors[i:i + batch] for i in range(0, len(query_vectors), batch)]
+        med, _, _ = timed(lambda qs: index.batch_search_by_vectors(qs, k=k), batches)
+        print(f"  numpy  batch of {batch:<4}      {med / batch:7.3f} ms per query")
+
+        if skip_chroma:
+            return
+        from langchain_community.vectorstores import Chroma
+
+        store = Chroma("bench_chunks", embedding_function=embedder, persist_directory=os.path.join(path, "chroma"))
+        start = time.perf_counter()
+        for offset in range(0, size, 5000):
+            store.add_documents(documents[offset:offset + 5000], ids=ids[offset:offset + 5000])
+        print(f"  chroma build {time.perf_counter() - start:8.2f} s")
+
+        med, p99, approx = timed(lambda q: store.similarity_search_by_vector(q, k=k), query_vectors)
+        print(f"  chroma top-{k:<3}            median {med:7.3f} ms  p99 {p99:7.3f} ms")
+        med, p99, _ = timed(lambda q: store.similarity_search_by_vector(q, k=k, filter=where), query_vectors)
+        print(f"  chroma top-{k:<3} filtered   median {med:7.3f} ms  p99 {p99:7.3f} ms")
+
+        recall = statistics.mean(
+            len({d.page_content for d in a} & {d.page_content for d in e}) / k for a, e in zip(approx, exact)
+        )
+        print(f"  chroma recall@{k} vs exact: {recall:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        bench_size(size, args.dim, args.k, args.queries, args.batch, args.skip_chroma)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Local stand-ins for the remote embedding API and Gemini, with injectable latency.
+
+Both count their calls so a benchmark can show how many upstream requests a
+code path made.
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Iterator, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import embeddings
+
+
+class LatencyEmbeddings:
+    """Hashing embeddings (meaningful for retrieval, no download) plus a fixed delay per call."""
+
+    def __init__(self, latency_ms: float = 0.0, dim: int = embeddings.EMBEDDING_HASHING_DIM):
+        self.inner = embeddings.HashingEmbeddings(dim)
+        self.model = f"latency-{self.inner.model}"
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _call(self, fn, arg):
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return fn(arg)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call(self.inner.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(self.inner.embed_query, text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._call(self.inner.embed_queries, texts)
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def _words(self, contents: str) -> List[str]:
+        question = contents.rsplit("QUESTION:", 1)[-1].split("ANSWER:", 1)[0].strip()
+        return f"Based on the provider data, here is what I found about: {question}".split(" ")
+
+    def generate_content(self, model: str, contents: str):
+        client = self._client
+        client.calls += 1
+        words = self._words(contents)
+        time.sleep((client.first_token_ms + client.token_ms * (len(words) - 1)) / 1000)
+        return SimpleNamespace(text=" ".join(words))
+
+    def generate_content_stream(self, model: str, contents: str) -> Iterator[SimpleNamespace]:
+        client = self._client
+        client.calls += 1
+        time.sleep(client.first_token_ms / 1000)
+        for i, word in enumerate(self._words(contents)):
+            if i:
+                time.sleep(client.token_ms / 1000)
+            yield SimpleNamespace(text=word if i == 0 else " " + word)
+
+
+class FakeGeminiClient:
+    """Drop-in for ``genai.Client`` as used by RagEngine: ``client.models.generate_content(_stream)``."""
+
+    def __init__(self, first_token_ms: float = 400.0, token_ms: float = 15.0):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.calls = 0
+        self.models = _FakeModels(self)
@@ -0,0 +1,217 @@
+"""In-process load driver for the FastAPI app: search, book, view-bookings and cancel mixes.
+
+The app is imported with a temporary SQLite database seeded from a synthetic
+``data.json`` (``synthetic.make_catalog``), started with its own startup hook
+and driven through ``httpx.ASGITransport``, so no server or network is
+involved. Each scenario sends ``--requests`` requests from ``--concurrency``
+concurrent clients and reports throughput and p50/p95/p99 latency (overall
+and per operation) as JSON.
+
+Operations:
+- search: GET /api/routes (served by the in-memory route catalog);
+- search_sql: the same request with the catalog unloaded, so it goes to
+  ``crud.get_buses_by_route``;
+- page: GET /api/all_routes filtered by origin (keyset SQL page);
+- book: POST /api/book_ticket for a random route and seat (409 when taken);
+- view: GET /api/bookings/{phone};
+- cancel: POST /api/cancel_booking/{id} for a booking made in setup.
+
+    python benchmarks/load_api.py --requests 2000 --concurrency 32 --out before.json
+    python benchmarks/load_api.py --scenarios mixed --mix search=70,view=15,book=10,cancel=5
+    python benchmarks/report.py before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKDIR = tempfile.mkdtemp(prefix="load_api_")
+# Set before the app modules read them at import.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'businfo.db')}")
+os.environ.update({
+    "EMBEDDING_BACKEND": "hashing",
+    "VECTOR_STORE": "numpy",
+    "VECTOR_INDEX_PATH": os.path.join(WORKDIR, "bus_index"),
+    "EMBEDDING_CACHE_PATH": os.path.join(WORKDIR, "embedding_cache"),
+    "ANSWER_CACHE_PATH": os.path.join(WORKDIR, "answer_cache.db"),
+})
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+import httpx
+
+from report import latency_summary, scenario_result, write_results
+from synthetic import make_catalog, route_count
+
+SCENARIOS = ("search", "search_sql", "page", "book", "view", "cancel", "mixed")
+DEFAULT_MIX = "search=60,page=10,view=15,book=10,cancel=5"
+PHONES = [f"0171{i:07d}" for i in range(500)]
+
+
+class LoadState:
+    def __init__(self, data: dict, route_ids: list, seed: int):
+        self.rng = random.Random(seed)
+        self.route_ids = route_ids
+        self.pairs = [
+            (origin, destination)
+            for provider in data["bus_providers"]
+            for origin in provider["coverage_districts"]
+            for destination in provider["coverage_districts"]
+            if origin != destination
+        ]
+        self.origins = sorted({origin for origin, _ in self.pairs})
+        self.seats = [f"{row}{col}" for row in range(1, 11) for col in "ABCD"]
+        self.cancellable: list = []
+
+
+async def op_search(client, state):
+    origin, destination = state.rng.choice(state.pairs)
+    return await client.get("/api/routes", params={"origin": origin, "destination": destination})
+
+
+async def op_page(client, state):
+    return await client.get("/api/all_routes", params={"origin": state.rng.choice(state.origins), "limit": 100})
+
+
+async def op_book(client, state):
+    response = await client.post("/api/book_ticket", json={
+        "route_id": state.rng.choice(state.route_ids),
+        "user_name": "Load Test",
+        "user_phone": state.rng.choice(PHONES),
+        "seat_number": state.rng.choice(state.seats),
+    })
+    if response.status_code == 201:
+        state.cancellable.append(response.json()["id"])
+    return response
+
+
+async def op_view(client, state):
+    return await client.get(f"/api/bookings/{state.rng.choice(PHONES)}")
+
+
+async def op_cancel(client, state):
+    if not state.cancellable:
+        return await op_book(client, state)
+    booking_id = state.cancellable.pop(state.rng.randrange(len(state.cancellable)))
+    return await client.post(f"/api/cancel_booking/{booking_id}")
+
+
+OPERATIONS = {"search": op_search, "search_sql": op_search, "page": op_page, "book": op_book, "view": op_view, "cancel": op_cancel}
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}' in --mix; choose from {', '.join(OPERATIONS)}.")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+@contextmanager
+def catalog_unloaded():
+    """Serve /api/routes from SQL (crud.get_buses_by_route) for the duration of the block."""
+    import catalog
+
+    saved, catalog._catalog = catalog._catalog, None
+    try:
+        yield
+    finally:
+        catalog._catalog = saved
+
+
+async def run_scenario(client, state, name: str, mix: dict, requests: int, concurrency: int) -> dict:
+    if "cancel" in mix:
+        # Bookings to cancel are made up front and not timed.
+        needed = int(requests * mix["cancel"] / sum(mix.values())) + 1
+        while len(state.cancellable) < needed:
+            await op_book(client, state)
+
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    plan = state.rng.choices(names, weights=weights, k=requests)
+    samples, by_op, statuses = [], defaultdict(list), Counter()
+    cursor = iter(plan)
+
+    async def worker():
+        for op in cursor:
+            start = time.perf_counter()
+            response = await OPERATIONS[op](client, state)
+            elapsed = (time.perf_counter() - start) * 1000
+            samples.append(elapsed)
+            by_op[op].append(elapsed)
+            statuses[str(response.status_code)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if status.startswith("5"))
+    return scenario_result(
+        name, seconds, samples, concurrency=concurrency, errors=errors, status=dict(statuses),
+        operations={op: latency_summary(values) for op, values in by_op.items()} if len(by_op) > 1 else None,
+    )
+
+
+async def drive(app, state, args) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        await run_scenario(client, state, "warmup", {"search": 1, "view": 1}, min(200, args.requests), args.concurrency)
+        results = []
+        for name in args.scenarios:
+            mix = parse_mix(args.mix) if name == "mixed" else {name: 1}
+            if name == "search_sql":
+                with catalog_unloaded():
+                    results.append(await run_scenario(client, state, name, mix, args.requests, args.concurrency))
+            else:
+                results.append(await run_scenario(client, state, name, mix, args.requests, args.concurrency))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weights for the mixed scenario")
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--districts", type=int, default=64)
+    parser.add_argument("--dropping-points", type=int, default=4)
+    parser.add_argument("--coverage", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="-", help="JSON results path, or - for stdout")
+    args = parser.parse_args()
+
+    data = make_catalog(args.providers, args.districts, args.dropping_points, args.coverage, args.seed)
+    os.makedirs(os.path.join(WORKDIR, "data"))
+    os.makedirs(os.path.join(WORKDIR, "app"))
+    with open(os.path.join(WORKDIR, "data", "data.json"), "w") as f:
+        json.dump(data, f)
+    # The app reads ../data/data.json relative to its working directory.
+    os.chdir(os.path.join(WORKDIR, "app"))
+    print(f"{route_count(data)} routes, database {os.environ['DATABASE_URL']}", file=sys.stderr)
+
+    import main as api
+    import models
+    import startup
+    from database import SessionLocal
+
+    api.startup_event()
+    startup.wait()
+    with SessionLocal() as db:
+        route_ids = [row[0] for row in db.query(models.BusRoute.id)]
+    state = LoadState(data, route_ids, args.seed)
+
+    results = asyncio.run(drive(api.app, state, args))
+    write_results("load_api", args, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Concurrent booking load test for a single popular route.
+
+N clients race to book random seats on one route until it is sold out.
+Afterwards every seat must be booked exactly once and the seat bitmap must
+agree with the bookings table.
+
+    python benchmarks/load_test_seats.py --clients 32 --seats 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import ingest
+import models
+import schemas
+import seats
+from database import Base, make_engine
+
+
+def client(Session, route_id: int, seed: int, stats: Counter, lock: threading.Lock):
+    rng = random.Random(seed)
+    local = Counter()
+    with Session() as db:
+        route = db.get(models.BusRoute, route_id)
+        while True:
+            available = seats.available_seats(db, route)
+            if not available:
+                break
+            booking = schemas.BookingCreate(
+                route_id=route_id, user_name=f"client {seed}", user_phone=f"0170{seed:07d}", seat_number=rng.choice(available)
+            )
+            try:
+                crud.create_booking(db, booking, route)
+                local["booked"] += 1
+            except HTTPException as e:
+                db.rollback()
+                local[f"http {e.status_code}"] += 1
+            except OperationalError:
+                db.rollback()
+                local["db busy"] += 1
+    with lock:
+        stats.update(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seats", type=int, default=160)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'seats.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            ingest.sync_catalog(db, {
+                "districts": [{"name": "Dhaka", "dropping_points": []}, {"name": "Sylhet", "dropping_points": [{"name": "Zindabazar", "price": 700}]}],
+                "bus_providers": [{"name": "Hanif", "coverage_districts": ["Dhaka", "Sylhet"]}],
+            })
+            route = db.query(models.BusRoute).first()
+            route.total_seats = args.seats
+            db.commit()
+            route_id = route.id
+
+        stats, lock = Counter(), threading.Lock()
+        threads = [threading.Thread(target=client, args=(Session, route_id, i, stats, lock)) for i in range(args.clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with Session() as db:
+            booked = db.execute(select(models.Booking.seat_number).where(models.Booking.route_id == route_id)).scalars().all()
+            bitmap = db.execute(select(models.SeatInventory.occupied).where(models.SeatInventory.route_id == route_id)).scalar_one()
+        engine.dispose()
+
+    duplicates = {seat: n for seat, n in Counter(booked).items() if n > 1}
+    attempts = sum(stats.values())
+    print(f"clients={args.clients} seats={args.seats} elapsed={elapsed:.2f}s")
+    print(f"attempts={attempts} ({attempts / elapsed:.0f}/s) outcomes={dict(stats)}")
+    print(f"bookings={len(booked)} bitmap_set={sum(bin(b).count('1') for b in bitmap)} duplicates={duplicates or 'none'}")
+    if duplicates or len(booked) != args.seats:
+        sys.exit("FAILED: seats were double booked or left unsold")
+    print("OK: every seat booked exactly once")
+
+
+if __name__ == "__main__":
+    main()
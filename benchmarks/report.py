@@ -0,0 +1,107 @@
+"""Latency summaries and JSON result files shared by the load and RAG benchmarks.
+
+A result file is one JSON object: ``meta`` (git commit, Python, arguments)
+and ``scenarios``, each with throughput and p50/p95/p99 latency in ms. Compare
+two runs with:
+
+    python benchmarks/report.py before.json after.json
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import List, Optional, Sequence
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of `samples` (q in 0..1)."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def latency_summary(samples_ms: Sequence[float]) -> dict:
+    if not samples_ms:
+        return {"count": 0}
+    return {
+        "count": len(samples_ms),
+        "mean": round(sum(samples_ms) / len(samples_ms), 3),
+        "p50": round(percentile(samples_ms, 0.50), 3),
+        "p95": round(percentile(samples_ms, 0.95), 3),
+        "p99": round(percentile(samples_ms, 0.99), 3),
+        "max": round(max(samples_ms), 3),
+    }
+
+
+def scenario_result(name: str, seconds: float, samples_ms: Sequence[float], **extra) -> dict:
+    """Throughput and latency for one scenario; `extra` adds scenario-specific fields."""
+    return {
+        "scenario": name,
+        "seconds": round(seconds, 3),
+        "throughput_per_s": round(len(samples_ms) / seconds, 2) if seconds else None,
+        "latency_ms": latency_summary(samples_ms),
+        **extra,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(benchmark: str, args, scenarios: List[dict], out: Optional[str]):
+    """Print a one-line summary per scenario and write the JSON document to `out` (``-`` for stdout)."""
+    document = {
+        "meta": {
+            "benchmark": benchmark,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+        },
+        "scenarios": scenarios,
+    }
+    for s in scenarios:
+        lat = s["latency_ms"]
+        if lat.get("count"):
+            print(f"{s['scenario']:<28} {s['throughput_per_s']:>9.1f}/s   p50 {lat['p50']:8.2f}  p95 {lat['p95']:8.2f}  "
+                  f"p99 {lat['p99']:8.2f} ms   n={lat['count']}", file=sys.stderr)
+    text = json.dumps(document, indent=2)
+    if out in (None, "-"):
+        print(text)
+    else:
+        with open(out, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {out}", file=sys.stderr)
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = {s["scenario"]: s for s in json.load(f)["scenarios"]}
+    with open(after_path) as f:
+        after = {s["scenario"]: s for s in json.load(f)["scenarios"]}
+
+    def change(old, new):
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "   n/a"
+
+    print(f"{'scenario':<28} {'throughput':>22} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    for name in [n for n in before if n in after]:
+        old, new = before[name], after[name]
+        cells = [f"{old['throughput_per_s']:>8.1f} {new['throughput_per_s']:>8.1f} {change(old['throughput_per_s'], new['throughput_per_s'])}"]
+        for q in ("p50", "p95", "p99"):
+            a, b = old["latency_ms"].get(q), new["latency_ms"].get(q)
+            cells.append(f"{a:>8.2f} {b:>8.2f} {change(a, b)}" if a is not None and b is not None else f"{'-':>22}")
+        print(f"{name:<28} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python benchmarks/report.py BEFORE.json AFTER.json")
+    compare(sys.argv[1], sys.argv[2])
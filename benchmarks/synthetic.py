@@ -0,0 +1,101 @@
+"""Synthetic ``data.json`` catalogs shaped like the real provider/district data.
+
+    python benchmarks/synthetic.py --providers 40 --districts 64 --dropping-points 4 --out data.json
+"""
+import random
+import sys
+
+
+def make_catalog(providers: int = 6, districts: int = 10, dropping_points: int = 3, coverage: int = 4, seed: int = 0) -> dict:
+    """Build a catalog with the same keys ``ingest.iter_routes`` reads.
+
+    Every provider covers ``coverage`` districts, so the route product is
+    ``providers * coverage * (coverage - 1) * dropping_points`` rows.
+    """
+    rng = random.Random(seed)
+    names = [f"District {i:04d}" for i in range(districts)]
+    return {
+        "districts": [
+            {
+                "name": name,
+                "dropping_points": [
+                    {"name": f"{name} Point {j}", "price": rng.randrange(300, 1500, 10)}
+                    for j in range(dropping_points)
+                ],
+            }
+            for name in names
+        ],
+        "bus_providers": [
+            {"name": f"Provider {i:03d}", "coverage_districts": rng.sample(names, min(coverage, districts))}
+            for i in range(providers)
+        ],
+    }
+
+
+def route_count(catalog: dict) -> int:
+    points = {d["name"]: len(d["dropping_points"]) for d in catalog["districts"]}
+    total = 0
+    for provider in catalog["bus_providers"]:
+        covered = provider["coverage_districts"]
+        total += sum(points[d] for d in covered) * (len(covered) - 1)
+    return total
+
+
+POLICY_SECTIONS = ("contact", "cancellation", "luggage")
+
+
+def make_policy_documents(catalog: dict, seed: int = 0) -> list:
+    """(text, metadata) pairs shaped like the provider policy files in ``data/attachment``.
+
+    One document per provider and section; the shared boilerplate makes
+    providers hard to tell apart by meaning alone, as in the real files.
+    """
+    rng = random.Random(seed)
+    documents = []
+    for provider in catalog["bus_providers"]:
+        name = provider["name"]
+        slug = name.lower().replace(" ", "")
+        texts = {
+            "contact": (
+                f"{name} contact details. Head office hotline: 01{rng.randrange(10**8, 10**9)}. "
+                f"Email: support@{slug}.com. Counters open from {rng.randint(5, 8)} AM to {rng.randint(9, 11)} PM "
+                f"at {rng.choice(provider['coverage_districts'])} terminal."
+            ),
+            "cancellation": (
+                f"{name} cancellation and refund policy. Tickets cancelled at least {rng.choice([6, 12, 24, 48])} hours "
+                f"before departure are refunded {rng.choice([50, 70, 80, 90])}% of the fare. No refund after departure."
+            ),
+            "luggage": (
+                f"{name} luggage policy. Each passenger may carry {rng.choice([10, 15, 20, 25])} kg free of charge; "
+                f"extra luggage costs {rng.choice([20, 30, 50])} taka per kg. Children under {rng.choice([3, 5])} travel free."
+            ),
+        }
+        for section in POLICY_SECTIONS:
+            documents.append((texts[section], {"type": "policy", "provider_name": name, "section": section, "source": f"{slug}.txt"}))
+    return documents
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Write a synthetic data.json catalog.")
+    parser.add_argument("--providers", type=int, default=6)
+    parser.add_argument("--districts", type=int, default=10)
+    parser.add_argument("--dropping-points", type=int, default=3)
+    parser.add_argument("--coverage", type=int, default=4, help="Districts covered by each provider")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="-", help="Output path, or - for stdout")
+    args = parser.parse_args(argv)
+
+    catalog = make_catalog(args.providers, args.districts, args.dropping_points, args.coverage, args.seed)
+    if args.out == "-":
+        json.dump(catalog, sys.stdout)
+    else:
+        with open(args.out, "w") as f:
+            json.dump(catalog, f)
+    print(f"{route_count(catalog)} routes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()